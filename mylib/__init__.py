@@ -13,16 +13,33 @@ import mylib.test as mltest
 `BASE`
 - str_to_bits
 - bits_to_str
+- bits_to_bytes
+- stream_to_bits
 - gen_rand_bits
+- BitSource
 - correlation
+- corr_no_shift_batch
 - corr_array
 - auto_corr
+- corr_sliding
 - zadoff_chu
+- pss_template
+- pss_template_fft
+- crc16
+- crc16_check
 
 `SDR`
 - sdr_settings
 - tx_sig
 - rx_cycles_buffer
+- SimPluto
+
+`Channel`
+- Channel
+    - filter
+    - resample
+    - impair
+    - apply
 
 `Modulation`
 - bpsk
@@ -30,18 +47,33 @@ import mylib.test as mltest
 - qam16
 - qam64
 - qam256
+- Modem
 * dem_qpsk
 * dem_qam16
+* dem_qam64
+* dem_qam256
+* dem_soft
 * bpsk_synchro
+* bpsk_burst_indexes
+* bpsk_bursts
+* bpsk_stream
 
 `Class_OFDM`
 - OFDM_MOD
     - modulation
+    - slot_size
+    - verify_slots
     - fft
+    - equalize
+    - decode_many
     - get_sr_from_freq_step
     - activ_carriers
     - indiv_symbols
         - indexs_of_CP
+    - corr_pss_multi
+- OFDM_RX
+    - push
+    - reset
 
 `Plots`
 - cool_scatter
@@ -50,15 +82,37 @@ import mylib.test as mltest
 - eye_pattern
 - heat_map
 
+`Record`
+- IQRecorder
+- record_iq
+- load_iq
+- replay_iq
+
+`Diag`
+- diag
+- set_diag
+- get_diag
+- diagnostics
+- NullSink
+- CaptureSink
+- PlotSink
+
+`BER`
+- ber_mc
+
 ``by nicoskin``
 """
 
 from .base import *
 from .sdr import *
+from .channel import *
 from .modulation import *
 from .plots import *
 from .ofdm import *
 from .class_ofdm import *
+from .diag import *
+from .record import *
+from .ber import *
 
 from icecream import ic
 __all__ = ['ic']
\ No newline at end of file
@@ -2,39 +2,76 @@
 `BASE`
 - str_to_bits
 - bits_to_str
+- bits_to_bytes
+- stream_to_bits
 - gen_rand_bits
+- BitSource
 - corr_no_shift
+- corr_no_shift_batch
 - corr_array
 - auto_corr
+- corr_sliding
 - zadoff_chu
+- pss_template
+- pss_template_fft
+- crc16
+- crc16_check
 
 """
 
+import os
+from collections import OrderedDict
 import numpy as np
 
-def str_to_bits(str: str):
+def str_to_bits(str, encoding='ascii', dtype=int):
     """
     Преобразовает строку в битовую последовательност(ascii)
     
     Параметры
     -------------
-        `str` : строка которая кодируется
+        `str` : строка которая кодируется 
+            (или bytes / bytearray / memoryview - кодируются как есть)
+            
+        `encoding` : кодировка строки, 'ascii' | 'utf-8' | ...
+        
+        `dtype` : тип битов, по умолчанию int (np.uint8 - без лишней копии)
 
     Возвращает
     ----------
         `bit_array` : numpy array
             Закодированный массив ASCII (битовая последовательность)
     """
-    encoded_bytes = str.encode('ascii')
-    # Преобразование байтов в массив битов
-    bit_array = []
-    for byte in encoded_bytes:
-        bits = bin(byte)[2:].zfill(8)  # Преобразование в биты
-        bit_array.extend([int(bit) for bit in bits])
+    if isinstance(str, (bytes, bytearray, memoryview)):
+        encoded_bytes = str
+    else:
+        encoded_bytes = str.encode(encoding)
+    # Преобразование байтов в массив битов (старший бит первый)
+    bit_array = np.unpackbits(np.frombuffer(encoded_bytes, dtype=np.uint8))
 
-    return np.array(bit_array)
+    return bit_array.astype(dtype, copy=False)
+
+def bits_to_bytes(bit_array):
+    """
+    Преобразует битовую последовательность в bytes (старший бит первый).
+    
+    Неполный последний байт дополняется нулями слева, как целое число из оставшихся бит.
+
+    Параметры
+    ----------
+        `bit_array`: Битовая последовательность.
+        
+    Возвращает
+    --------
+        `data`: bytes
+    """
+    bit_array = np.asarray(bit_array).astype(np.uint8, copy=False)
+    tail = len(bit_array) % 8
+    if tail:
+        pad = np.zeros(8 - tail, dtype=np.uint8)
+        bit_array = np.concatenate((bit_array[:-tail], pad, bit_array[-tail:]))
+    return np.packbits(bit_array).tobytes()
 
-def bits_to_str(bit_array):
+def bits_to_str(bit_array, encoding=None):
     """
     Преобразует битовую последовательность в строку ASCII.
 
@@ -42,23 +79,72 @@ def bits_to_str(bit_array):
     ----------
         `bit_array`: Битовая последовательность.
         
+        `encoding`: кодировка, optional
+            None - каждый байт -> символ chr(byte) | 'utf-8' | 'ascii' | ...
+        
     Возвращает
     --------
         `decoded_str`: str
             Раскодированная строка ASCII.
     """
-    bit_array = np.array(bit_array)
-    
-
-    # Разбиваем биты на байты (по 8 бит в каждом)
-    bytes_list = [bit_array[i:i + 8] for i in range(0, len(bit_array), 8)]
-
-    # Преобразуем каждый байт в десятичное число и затем в символ ASCII
-    decoded_str = ''.join([chr(int(''.join(map(str, byte)), 2)) for byte in bytes_list])
+    data = bits_to_bytes(bit_array)
+    if encoding is None:
+        decoded_str = data.decode('latin-1')
+    else:
+        decoded_str = data.decode(encoding, errors='replace')
     decoded_str = decoded_str.rstrip('\x00')
     
     return decoded_str
 
+def stream_to_bits(source, chunk_size=2**16, dtype=np.uint8):
+    """
+    Генератор блоков бит из файла или потока байт, не загружая его целиком в память
+    
+    for bits in ml.stream_to_bits("file.bin"):
+        samples = ml.qpsk(bits)
+
+    Параметры
+    ----------
+        `source`: путь к файлу | бинарный файловый объект (с .read) |
+            bytes / bytearray / memoryview | итератор по кускам bytes
+        
+        `chunk_size`: размер блока в байтах (блок бит = chunk_size * 8)
+        
+        `dtype`: тип битов
+        
+    Возвращает
+    --------
+        генератор `bits`: numpy array блоками по chunk_size*8 бит 
+            (последний блок может быть короче)
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source).cast('B')
+        for i in range(0, len(view), chunk_size):
+            yield str_to_bits(view[i:i + chunk_size], dtype=dtype)
+        return
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            yield from stream_to_bits(f, chunk_size, dtype)
+        return
+
+    if hasattr(source, 'readinto'):
+        buf = bytearray(chunk_size)
+        while True:
+            n = source.readinto(buf)
+            if not n:
+                break
+            yield str_to_bits(memoryview(buf)[:n], dtype=dtype)
+        return
+
+    if hasattr(source, 'read'):
+        reader = iter(lambda: source.read(chunk_size), b'')
+    else:
+        reader = iter(source)
+    for chunk in reader:
+        if len(chunk):
+            yield str_to_bits(chunk, dtype=dtype)
+
 def corr_no_shift(x, y, norm=True, complex = False):
     """
     Вычисляет взаимную корреляцию двух одномерных массивов(без смещения)
@@ -89,7 +175,212 @@ def corr_no_shift(x, y, norm=True, complex = False):
         c = np.dot(x, y)
         return c
 
-def corr_array(x, y):
+def corr_no_shift_batch(x, y, mode='norm', pairwise=False, dtype=None, out=None):
+    """
+    corr_no_shift сразу для стека окон и одного или нескольких опорных массивов
+    
+    Все корреляции считаются одним matmul, без цикла Python.
+    
+    windows = np.lib.stride_tricks.sliding_window_view(rx, 63)
+    
+    corr = ml.corr_no_shift_batch(windows, pss, mode='coherent')
+
+    Параметры
+    ------------
+        `x`: окна [..., n_win, M] (например sliding_window_view)
+        
+        `y`: опорный массив [M] или стек [n_ref, M] 
+            (при pairwise=True - [..., n_win, M], своё опорное окно на каждое окно x)
+        
+        `mode`: 
+            'dot' - без нормирования (norm=False)
+            
+            'norm' - dot(x, y) / (||x|| ||y||) (norm=True)
+            
+            'split' - real и imag нормируются отдельно (norm=True, complex=True)
+            
+            'coherent' - |<x, y>| / (||x|| ||y||), <x, y> = sum x * conj(y)
+        
+        `pairwise`: y - стек окон той же формы что x, корреляция строка со строкой
+        
+        `dtype`: точность результата, np.float32 / np.complex64 - считать в одинарной
+            точности (комплексный результат остается комплексным: 'norm' и 'dot' для
+            комплексных массивов дают complex64 и при dtype=np.float32)
+        
+        `out`: буфер для результата, optional
+        
+    Возвращает
+    ----------  
+        Корреляция [..., n_win] (y одномерный или pairwise) или [..., n_win, n_ref]
+        (окна с нулевой нормой дают 0)
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if dtype is not None and np.dtype(dtype) in (np.float32, np.complex64):
+        x = x.astype(np.complex64 if np.iscomplexobj(x) else np.float32, copy=False)
+        y = y.astype(np.complex64 if np.iscomplexobj(y) else np.float32, copy=False)
+
+    def res_dtype(a):
+        # Точность - из dtype, вещественный / комплексный - из результата
+        if dtype is None:
+            return a.dtype
+        prec = np.finfo(dtype).dtype
+        return np.result_type(prec, np.complex64) if np.iscomplexobj(a) else prec
+
+    def dot(a, b):
+        if pairwise:
+            return np.einsum('...i,...i->...', a, b)
+        return a @ (b if b.ndim == 1 else b.T)
+
+    def norm(a):
+        n2 = np.einsum('...i,...i->...', a.real, a.real)
+        if np.iscomplexobj(a):
+            n2 = n2 + np.einsum('...i,...i->...', a.imag, a.imag)
+        return np.sqrt(n2)
+
+    def normed(num, a, b, res=None):
+        na = norm(a)
+        nb = norm(b)
+        if not pairwise and b.ndim > 1:
+            na = na[..., np.newaxis]
+        den = na * nb
+        if res is None:
+            res = np.zeros(np.broadcast_shapes(num.shape, den.shape), dtype=res_dtype(num))
+        else:
+            res[...] = 0
+        return np.divide(num, den, out=res, where=den > 0, casting='same_kind')
+
+    if mode == 'dot':
+        res = dot(x, y)
+    elif mode == 'norm':
+        return normed(dot(x, y), x, y, out)
+    elif mode == 'split':
+        res = normed(dot(x.real, y.real), x.real, y.real)
+        if np.iscomplexobj(x) or np.iscomplexobj(y):
+            res = res + 1j * normed(dot(x.imag, y.imag), x.imag, y.imag)
+    elif mode == 'coherent':
+        return normed(np.abs(dot(x, np.conj(y))), x, y, out)
+    else:
+        raise ValueError("mode должен быть 'dot', 'norm', 'split' или 'coherent'")
+
+    if out is not None:
+        np.copyto(out, res, casting='same_kind')
+        return out
+    return res.astype(res_dtype(res), copy=False)
+
+def _next_pow2(n):
+    """Ближайшая степень двойки >= n"""
+    return 1 << max(int(n) - 1, 0).bit_length()
+
+def _moving_sum(x, n):
+    """
+    Скользящая сумма окна `n` по последней оси через кумулятивную сумму (O(N))
+
+    Возвращает массив длиной len(x) - n + 1
+    """
+    x = np.asarray(x)
+    c = np.cumsum(x, axis=-1, dtype=np.result_type(x.dtype, np.float64))
+    zero = np.zeros(c.shape[:-1] + (1,), dtype=c.dtype)
+    c = np.concatenate((zero, c), axis=-1)
+    return c[..., n:] - c[..., :-n]
+
+# Кол-во отсчётов, которое overlap-save обрабатывает за одну пачку FFT
+_OS_BATCH = 2**20
+
+def _corr_valid_fft(x, y, nfft=None, H=None):
+    """
+    Числитель скользящей корреляции sum(x[i+k] * y[k]) для i = 0..len(x)-len(y)
+    
+    Считается через FFT методом overlap-save: блоки длины `nfft`
+    с перекрытием len(y)-1, если вход короче блока - одно FFT на весь массив.
+    `H` - готовый спектр conj(fft(conj(y), nfft)) (например из pss_template_fft).
+    
+    `y` (и `H`) может быть стеком шаблонов [n_ref, M]: FFT блока входа считается
+    один раз для всех шаблонов, результат [n_ref, len(x)-M+1].
+    """
+    M = np.shape(y)[-1]
+    n_out = len(x) - M + 1
+    real = not (np.iscomplexobj(x) or np.iscomplexobj(y))
+    if H is not None:
+        nfft = (np.shape(H)[-1] - 1) * 2 if real else np.shape(H)[-1]
+    elif nfft is None:
+        nfft = min(max(_next_pow2(8 * M), 1024), _next_pow2(len(x)))
+    nfft = max(int(nfft), _next_pow2(M))
+    L = nfft - M + 1  # полезных отсчетов на блок
+    n_blocks = -(-n_out // L)
+
+    if real:
+        fft, ifft = np.fft.rfft, np.fft.irfft
+        x = np.asarray(x, dtype=np.float64)
+    else:
+        fft, ifft = np.fft.fft, np.fft.ifft
+        x = np.asarray(x, dtype=np.complex128)
+    if H is None:
+        H = np.conj(fft(np.conj(y), nfft, axis=-1))
+    H = np.asarray(H)
+    lead = H.shape[:-1]  # () или (n_ref,)
+    H = H[..., np.newaxis, :]
+
+    xp = np.zeros(n_blocks * L + M - 1, dtype=x.dtype)
+    xp[:len(x)] = x
+    frames = np.lib.stride_tricks.sliding_window_view(xp, nfft)[::L] if len(xp) >= nfft \
+        else xp[np.newaxis]
+    
+    out = np.empty(lead + (n_blocks, L), dtype=x.dtype)
+    step = max(1, _OS_BATCH // (nfft * int(np.prod(lead))))
+    for i in range(0, n_blocks, step):
+        X = fft(frames[i:i + step], nfft, axis=-1)
+        out[..., i:i + step, :] = ifft(X * H, nfft, axis=-1)[..., :L]
+    return out.reshape(lead + (-1,))[..., :n_out]
+
+def corr_sliding(x, y, norm=True, conj=False, dtype=None, nfft=None):
+    """
+    Скользящая корреляция массива `x` с шаблоном `y` через FFT, O(N log N)
+    
+    То же самое что corr_no_shift(x[i:i+len(y)], y) для каждого сдвига i,
+    но без цикла. Энергия окна считается через кумулятивную сумму.
+    
+    len(x) >= len(y)
+
+    Параметры
+    ----------
+        `x`: массив сигнала (real или complex)
+        
+        `y`: шаблон
+        
+        `norm`: нормировать на ||x_окна|| * ||y||
+        
+        `conj`: комплексно сопрягать `y` (sum x * conj(y)) 
+        
+        `dtype`: тип результата, например np.float32 / np.complex64
+        
+        `nfft`: длина блока overlap-save (по умолчанию подбирается сама)
+
+    Возвращает
+    --------
+        `corr`: NParray
+            Массив корреляции длиной len(x) - len(y) + 1
+            (окна с нулевой энергией дают 0)
+    """
+    # int16 и т.п.: |x|^2 переполняется в целом типе
+    x = np.asarray(x, dtype=np.result_type(x, np.float64))
+    y = np.asarray(y)
+    if len(x) < len(y):
+        raise ValueError("Длина x должна быть не меньше длины y")
+
+    corr = _corr_valid_fft(x, np.conj(y) if conj else y, nfft)
+    if norm:
+        power = np.abs(x)**2
+        energy = _moving_sum(power, len(y))
+        # погрешность кумулятивной суммы ~ eps * полная энергия
+        tol = 64 * np.finfo(np.float64).eps * np.sum(power)
+        den = np.sqrt(np.maximum(energy, 0)) * np.linalg.norm(y)
+        corr = np.divide(corr, den, out=np.zeros_like(corr), where=energy > tol)
+    if dtype is not None:
+        corr = corr.astype(dtype, copy=False)
+    return corr
+
+def corr_array(x, y, dtype=None):
     """Корреляция двух массивов 
     
     len(x) > len(y)
@@ -97,20 +388,17 @@ def corr_array(x, y):
     Параметры
     ----------
         `x`, `y`: Первый и второй массив
+        
+        `dtype`: тип результата (np.float32 / np.complex64), optional
 
     Возвращает
     --------
         `x+y`: NParray
             Массив корреляции
     """
-    arr = []
-    for i in range(len(x)-len(y)+1):
-        xx = x[i:(i+len(y))]
-        arr.append(corr_no_shift(xx, y))
-    arr = np.array(arr)
-    return arr
+    return corr_sliding(x, y, dtype=dtype)
 
-def auto_corr(x, y):
+def auto_corr(x, y, dtype=None):
     """
     Автокорреляция двух массивов 
     
@@ -119,35 +407,33 @@ def auto_corr(x, y):
     Параметры
     ----------
         `x`, `y`: Первый и второй массив
+        
+        `dtype`: тип результата (np.float32 / np.complex64), optional
 
     Возвращает
     --------
         `x+y`: NParray
             Массив автокорреляции
     """
-    
-    arr = []
     if len(x) <= len(y):
         print('Длинна X меньше длинны Y')
         return -1
     
-    for i in range(len(x)-len(y)+1):
-        xx = x[i:(i+len(y))]
-        corr = np.dot(xx, y) / (np.linalg.norm(xx) * np.linalg.norm(y))
-        arr.append(corr)
-    
-    arr = np.array(arr)
-    return arr
+    return corr_sliding(x, y, dtype=dtype)
 
 def gen_rand_bits(n: int, seed = 100):
     """
     Генерирует случайную битовую последовательность
+    
+    При seed != 0 глобальный np.random не пересеивается (свой RandomState на вызов),
+    последовательность та же что и раньше. seed=0 - продолжение глобального
+    потока np.random (воспроизводится после np.random.seed). Для новых задач - BitSource.
 
     Параметры
     ----------
         `n`: длинна битовой последовательности
         
-        `seed`: сид рандом функции
+        `seed`: сид рандом функции (0 - глобальный np.random без пересеивания)
 
 
     Возвращает
@@ -155,22 +441,161 @@ def gen_rand_bits(n: int, seed = 100):
         `bit_array`: NParray
             Массив случайных битов
     """
-    if seed != 0:
-        np.random.seed(seed)
-    bit_array = np.random.randint(0, 2, n)
+    rs = np.random.RandomState(seed) if seed != 0 else np.random
+    bit_array = rs.randint(0, 2, n)
     return bit_array
 
-def zadoff_chu(N=1, u=25, PSS=False):
+# PRBS ITU-T O.150: x^a + x^b + 1  ->  s[n] = s[n-a] ^ s[n-b]
+_PRBS_TAPS = {
+    'pn9': (9, 5),
+    'pn15': (15, 14),
+    'pn23': (23, 18),
+}
+
+class BitSource:
     """
-    Zadoff-Chu sequence
-        N - length
+    Источник бит: случайные (свой np.random.Generator) или PRBS PN9 / PN15 / PN23
+    
+    Каждый объект независим (без глобального np.random.seed), 
+    состояние сохраняется между вызовами - можно генерировать потоком.
+    
+    src = ml.BitSource(seed=1)
+    
+    bits = src.bits(1000)
+    
+    for block in ml.BitSource('pn23').stream(10**9, packed=True): ...
+
+    Параметры
+    ----------
+        `kind`: 'random' | 'pn9' | 'pn15' | 'pn23'
         
-        u - root index 25 29 34
+        `seed`: сид для 'random' (int | SeedSequence | Generator)
         
-        PSS [optional] - Primary synchronization signal
-            N - 63 
-            Len - 62
+        `state`: начальное состояние регистра PRBS (int != 0), по умолчанию все единицы
+    """
+    # Максимальное кол-во бит PRBS за один векторный шаг
+    _PRBS_STEP = 2**20
+
+    def __init__(self, kind='random', seed=None, state=None):
+        self.kind = kind.lower()
+        if self.kind == 'random':
+            self.rng = np.random.default_rng(seed)
+        elif self.kind in _PRBS_TAPS:
+            a, b = _PRBS_TAPS[self.kind]
+            if state is None:
+                state = (1 << a) - 1
+            if not 0 < state < (1 << a):
+                raise ValueError(f"state для {self.kind} должен быть от 1 до {(1 << a) - 1}")
+            # Последние выданные биты (история LFSR), старший бит state - самый ранний
+            self._hist = ((state >> np.arange(a - 1, -1, -1)) & 1).astype(np.uint8)
+            self._pending = self._hist
+        else:
+            raise ValueError("kind должен быть 'random', 'pn9', 'pn15' или 'pn23'")
+
+    def spawn(self, n):
+        """Независимые дочерние источники (для потоков / процессов), только для 'random'"""
+        if self.kind != 'random':
+            raise ValueError("spawn доступен только для kind='random'")
+        return [BitSource(seed=g) for g in self.rng.spawn(n)]
+
+    def _prbs(self, n):
+        """
+        PRBS блоками: в GF(2) s[n] = s[n-a*2^k] ^ s[n-b*2^k] для любого k,
+        поэтому за один XOR получаем b*2^k бит сразу
+        """
+        a, b = _PRBS_TAPS[self.kind]
+        # Первые a бит последовательности - само начальное состояние
+        head = self._pending[:n]
+        self._pending = self._pending[len(head):]
+        n -= len(head)
+        if n == 0:
+            return head.copy()
+
+        hist = self._hist
+        buf = np.empty(len(hist) + n, dtype=np.uint8)
+        buf[:len(hist)] = hist
+        pos = len(hist)
+        k = 0
+        while pos < len(buf):
+            while (a << (k + 1)) <= pos and (b << (k + 1)) <= self._PRBS_STEP:
+                k += 1
+            A, B = a << k, b << k
+            m = min(B, len(buf) - pos)
+            np.bitwise_xor(buf[pos - A:pos - A + m], buf[pos - B:pos - B + m], out=buf[pos:pos + m])
+            pos += m
+        keep = a * (self._PRBS_STEP // b + 1)
+        self._hist = buf[-keep:].copy()
+        return np.concatenate((head, buf[len(hist):]))
+
+    def bits(self, n, packed=False):
+        """
+        Следующие `n` бит
+
+        Параметры
+        ----------
+            `n`: кол-во бит
+            
+            `packed`: вернуть упакованные байты np.uint8 (8 бит в байте, старший первый)
+
+        Возвращает
+        --------
+            `bits`: NParray np.uint8 [n] или [ceil(n/8)] если packed
+        """
+        n = int(n)
+        if self.kind == 'random':
+            nbytes = -(-n // 8)
+            raw = self.rng.integers(0, 256, nbytes, dtype=np.uint8)
+            if packed:
+                if n % 8:
+                    raw[-1] &= np.uint8((0xFF << (8 - n % 8)) & 0xFF)
+                return raw
+            return np.unpackbits(raw, count=n)
+        bits = self._prbs(n)
+        if packed:
+            return np.packbits(bits)
+        return bits
+
+    def stream(self, n_total, chunk_size=2**20, packed=False):
+        """
+        Генератор блоков по `chunk_size` бит (всего `n_total`), память не растёт с n_total
+
+        for block in src.stream(10**9): ...
+        """
+        if packed and chunk_size % 8:
+            raise ValueError("Для packed chunk_size должен быть кратен 8")
+        n_total = int(n_total)
+        for start in range(0, n_total, chunk_size):
+            yield self.bits(min(chunk_size, n_total - start), packed)
+
+class _ReferenceBank:
     """
+    LRU-кэш опорных последовательностей (ZC, PSS, их FFT)
+    
+    Ключ - (u, длина, N_fft, domain), значения - read-only массивы
+    """
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key, factory):
+        try:
+            self._data.move_to_end(key)
+            return self._data[key]
+        except KeyError:
+            pass
+        arr = np.asarray(factory())
+        arr.flags.writeable = False
+        self._data[key] = arr
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return arr
+
+    def clear(self):
+        self._data.clear()
+
+_REF_BANK = _ReferenceBank()
+
+def _zadoff_chu(N, u, PSS):
     if PSS:
         N = 63
         n = np.arange(0, 31)
@@ -180,4 +605,197 @@ def zadoff_chu(N=1, u=25, PSS=False):
         return np.concatenate([ex1, ex2])
     else:  
         n = np.arange(0, N)
-        return np.exp(-1j * np.pi * u * n * (n + 1) / N)
\ No newline at end of file
+        return np.exp(-1j * np.pi * u * n * (n + 1) / N)
+
+def zadoff_chu(N=1, u=25, PSS=False):
+    """
+    Zadoff-Chu sequence
+        N - length
+        
+        u - root index 25 29 34
+        
+        PSS [optional] - Primary synchronization signal
+            N - 63 
+            Len - 62
+            
+    Последовательности кэшируются, возвращается read-only массив
+    (для изменения нужен .copy())
+    """
+    if PSS:
+        return _REF_BANK.get((u, 62, None, 'pss'), lambda: _zadoff_chu(63, u, True))
+    return _REF_BANK.get((u, N, None, 'zc'), lambda: _zadoff_chu(N, u, False))
+
+def _pss_template(N_fft, u, domain):
+    pss = zadoff_chu(u=u, PSS=True)
+    if domain == 'freq':
+        # 63 поднесущие с нулём на месте 32
+        return np.insert(pss, 32, 0)
+    if domain == 'grid':
+        # Сетка N_fft (до fftshift) с нулём в центре, как в OFDM_MOD.modulation
+        arr = np.zeros(N_fft, dtype=complex)
+        arr[N_fft//2 - 31 : N_fft//2] = pss[:31]
+        arr[N_fft//2 + 1: N_fft//2 + 32] = pss[31:]
+        return arr
+    if domain == 'time':
+        # Временной шаблон 63 отсчёта после IFFT
+        zeros = N_fft // 2 - 31
+        pss_ifft = np.insert(pss, 32, 0)
+        pss_ifft = np.insert(pss_ifft, 0, np.zeros(zeros))
+        pss_ifft = np.append(pss_ifft, np.zeros(zeros-1))
+        pss_ifft = np.fft.ifft(np.fft.fftshift(pss_ifft))
+        return pss_ifft[33:96]
+    if domain == 'symbol':
+        # Весь OFDM символ PSS во времени (N_fft отсчётов без CP)
+        return np.fft.ifft(np.fft.fftshift(_pss_template(N_fft, u, 'grid')))
+    raise ValueError("domain должен быть 'freq', 'grid', 'time' или 'symbol'")
+
+def pss_template(N_fft=64, u=25, domain='time'):
+    """
+    Опорный PSS для синхронизации (кэшируется, read-only)
+
+    Параметры
+    ----------
+        `N_fft`: длина FFT
+        
+        `u`: корень ZC 25 29 34
+        
+        `domain`: 
+            'freq' - 63 поднесущие (PSS с нулём на 32 месте)
+            
+            'grid' - сетка N_fft поднесущих как в OFDM_MOD (до fftshift)
+            
+            'time' - 63 отсчёта во времени после IFFT
+            
+            'symbol' - весь символ PSS во времени, N_fft отсчётов (для corr_pss_time)
+
+    Возвращает
+    --------
+        `pss`: NParray (read-only)
+    """
+    length = N_fft if domain in ('grid', 'symbol') else 63
+    return _REF_BANK.get((u, length, N_fft, domain), lambda: _pss_template(N_fft, u, domain))
+
+def pss_template_fft(N_fft=64, nfft=1024, u=25, domain='time'):
+    """
+    Спектр согласованного фильтра для PSS (кэшируется, read-only)
+    
+    H = conj(fft(pss, nfft)), так что ifft(fft(x_block) * H) даёт sum x[i+k] * conj(pss[k])
+    (подходит для _corr_valid_fft и overlap-save с блоком `nfft`)
+
+    Параметры
+    ----------
+        `N_fft`, `domain`: как в pss_template
+        
+        `nfft`: длина FFT блока (>= длины шаблона)
+        
+        `u`: корень ZC или кортеж корней (25, 29, 34) - тогда стек спектров
+
+    Возвращает
+    --------
+        `H`: NParray [nfft] или [len(u), nfft] (read-only)
+    """
+    if isinstance(u, (tuple, list)):
+        roots = tuple(u)
+        return _REF_BANK.get((roots, len(pss_template(N_fft, roots[0], domain)), N_fft, (domain, 'fft', nfft)),
+                             lambda: np.stack([pss_template_fft(N_fft, nfft, r, domain) for r in roots]))
+    ref = pss_template(N_fft, u, domain)
+    return _REF_BANK.get((u, len(ref), N_fft, (domain, 'fft', nfft)),
+                         lambda: np.conj(np.fft.fft(ref, nfft)))
+
+def _pss_norms(N_fft, roots, domain='time'):
+    """
+    Нормы ||pss|| шаблонов для кортежа корней (кэшируется, read-only [len(roots)])
+    """
+    roots = tuple(roots)
+    return _REF_BANK.get((roots, len(pss_template(N_fft, roots[0], domain)), N_fft, (domain, 'norm')),
+                         lambda: [np.linalg.norm(pss_template(N_fft, r, domain)) for r in roots])
+
+
+# Полином CRC слотов OFDM_MOD (старший коэффициент первый)
+_CRC_G = (1,0,1,0,0,1,1,1,0,1,0,0,0,1,0,1)
+_CRC_TABLE = None
+
+def _crc_table():
+    """
+    Таблица на 256 байт для CRC по полиному _CRC_G (степень 15, MSB first)
+    """
+    global _CRC_TABLE
+    if _CRC_TABLE is None:
+        width = len(_CRC_G) - 1
+        poly = int(''.join(map(str, _CRC_G[1:])), 2)
+        top, mask = 1 << (width - 1), (1 << width) - 1
+        reg = np.arange(256, dtype=np.uint32) << (width - 8)
+        for _ in range(8):
+            reg = np.where(reg & top, (reg << 1) ^ poly, reg << 1) & mask
+        _CRC_TABLE = reg.astype(np.uint32)
+    return _CRC_TABLE
+
+def crc16(bits):
+    """
+    CRC слота OFDM_MOD: полиномиальное деление bits + 16 нулей на G (16 отводов)
+    
+    Считается по байтам через таблицу на 256 значений и сразу для всех слотов.
+    Результат совпадает с побитовым делением:
+        
+        for i in range(len(data_crc)-16): if data_crc[i]: data_crc[i:i+16] ^= G
+
+    Параметры
+    ----------
+        `bits`: 
+            [nbits] - один слот
+            
+            [n, nbits] или список массивов разной длины - сразу n слотов
+
+    Возвращает
+    --------
+        `crc`: NParray np.uint8 [16] или [n, 16]
+    """
+    single = isinstance(bits, np.ndarray) and bits.ndim == 1 or \
+        not isinstance(bits, np.ndarray) and len(bits) and np.ndim(bits[0]) == 0
+    if single:
+        bits = [bits]
+    if isinstance(bits, np.ndarray):
+        rows = bits.astype(np.uint8, copy=False)
+    else:
+        # Нули в начале не меняют остаток - выравниваем слоты слева
+        lens = [len(b) for b in bits]
+        rows = np.zeros((len(bits), max(lens, default=0)), dtype=np.uint8)
+        for row, b, n in zip(rows, bits, lens):
+            row[len(row) - n:] = b
+
+    pad = (-rows.shape[1]) % 8
+    if pad:
+        rows = np.concatenate((np.zeros((len(rows), pad), dtype=np.uint8), rows), axis=1)
+    data = np.packbits(rows, axis=1)
+
+    width = len(_CRC_G) - 1
+    mask = (1 << width) - 1
+    table = _crc_table()
+    crc = np.zeros(len(data), dtype=np.uint32)
+    for col in data.T:
+        crc = ((crc << 8) & mask) ^ table[((crc >> (width - 8)) ^ col) & 0xFF]
+
+    # Остаток 15 бит (старший первый) + последний бит, до которого деление не доходит (= 0)
+    out = np.zeros((len(data), width + 1), dtype=np.uint8)
+    out[:, :width] = (crc[:, np.newaxis] >> np.arange(width - 1, -1, -1)) & 1
+    return out[0] if single else out
+
+def crc16_check(bits):
+    """
+    Проверка CRC: последние 16 бит каждого слота - crc16 от остальных
+
+    Параметры
+    ----------
+        `bits`: [nbits] | [n, nbits] | список массивов разной длины (данные + 16 бит CRC)
+
+    Возвращает
+    --------
+        `ok`: bool или NParray bool [n]
+    """
+    if isinstance(bits, np.ndarray) and bits.ndim == 1:
+        return bool(np.array_equal(crc16(bits[:-16]), bits[-16:]))
+    if isinstance(bits, np.ndarray):
+        return np.all(crc16(bits[:, :-16]) == bits[:, -16:], axis=1)
+    calc = crc16([b[:-16] for b in bits])
+    got = np.array([b[-16:] for b in bits], dtype=np.uint8).reshape(len(bits), 16)
+    return np.all(calc == got, axis=1)
@@ -0,0 +1,161 @@
+"""
+`BER`
+
+- ber_mc
+
+"""
+
+import os
+import numpy as np
+from statistics import NormalDist
+from .modulation import _modem
+
+def _wilson(errors, total, confidence):
+    """Доверительный интервал Уилсона для доли errors / total"""
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    n = np.maximum(total, 1)
+    p = errors / n
+    den = 1 + z**2 / n
+    center = (p + z**2 / (2 * n)) / den
+    half = z * np.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / den
+    return np.stack((np.maximum(center - half, 0), np.minimum(center + half, 1)))
+
+def _point_modem(rng, order, ebn0, block_bits, batch_bits):
+    """Один пакет для модема: (бит, ошибок, блоков, ошибочных блоков)"""
+    modem = _modem(order)
+    k = modem.bits_per_symbol
+    block_bits = -(-block_bits // k) * k
+    n_blocks = max(1, batch_bits // block_bits)
+    bits = rng.integers(0, 2, (n_blocks, block_bits), dtype=np.uint8)
+    sym = modem.modulate(bits.ravel())
+    # Es = 1: N0 = 1 / (k * Eb/N0)
+    sigma = np.sqrt(1 / (k * 10 ** (ebn0 / 10)) / 2)
+    sym += sigma * (rng.standard_normal(len(sym)) + 1j * rng.standard_normal(len(sym)))
+    err = modem.demodulate(sym).reshape(n_blocks, block_bits) != bits
+    return bits.size, int(np.sum(err)), n_blocks, int(np.sum(np.any(err, axis=1)))
+
+def _point_ofdm(rng, order, ebn0, mod, batch_bits):
+    """
+    Один пакет для цепочки OFDM_MOD: кадры по 5 слотов -> AWGN -> FFT -> эквалайзер
+    -> verify_slots -> демодуляция. Синхронизация идеальная, блок - слот.
+    """
+    modem = _modem(order)
+    k = modem.bits_per_symbol
+    slot_bits = mod.slot_size() * k
+    slots_per_frame = 5
+    n_frames = max(1, batch_bits // (slot_bits * slots_per_frame))
+    bits = rng.integers(0, 2, (n_frames * slots_per_frame, slot_bits), dtype=np.uint8)
+
+    # Все кадры подряд: [n_frames * n_sym, N_fft + CP]
+    frames = []
+    for f in range(n_frames):
+        mod.QAM_sym = modem.modulate(bits[f * slots_per_frame:(f + 1) * slots_per_frame].ravel())
+        frames.append(mod.modulation(amplitude_all=1, amplitude_data=1, amplitude_pilots=3,
+                                     amplitude_pss=3, ravel=False))
+    mod.QAM_sym = None
+    rows = np.concatenate(frames)
+
+    # Eb/N0 на поднесущей данных: бин = s * d, шум бина N * sigma^2, s = 1/3
+    N = mod.N_fft
+    s = 1 / 3
+    sigma = np.sqrt(s**2 / (N * k * 10 ** (ebn0 / 10)) / 2)
+    rows += sigma * (rng.standard_normal(rows.shape) + 1j * rng.standard_normal(rows.shape))
+
+    F = mod.fft(rows[:, mod.CP_len:], ravel=False)
+    F = F[np.arange(len(F)) % 6 != 0]
+    data, _ = mod.equalize(F, pilot_gain=3)
+    slots = data.reshape(len(bits), -1)
+    _, _, _, crc_ok = mod.verify_slots(slots)
+
+    # Биты данных - с их места в слоте (после 12 символов заголовка), независимо от заголовка
+    rx = modem.demodulate(slots[:, 12:12 + mod.slot_size()].ravel())
+    err = rx.reshape(bits.shape) != bits
+    block_err = np.any(err, axis=1) | ~crc_ok
+    return bits.size, int(np.sum(err)), len(bits), int(np.sum(block_err))
+
+def _ber_point(args):
+    """Одна точка Eb/N0 до target_errors ошибок или max_bits бит"""
+    seed, order, ebn0, chain, target_errors, max_bits, batch_bits, block_bits, N_fft = args
+    rng = np.random.default_rng(seed)
+    if chain == 'ofdm':
+        from .class_ofdm import OFDM_MOD
+        mod = OFDM_MOD(None, N_fft=N_fft)
+    totals = np.zeros(4, dtype=np.int64)
+    while totals[1] < target_errors and totals[0] < max_bits:
+        if chain == 'ofdm':
+            totals += _point_ofdm(rng, order, ebn0, mod, batch_bits)
+        else:
+            totals += _point_modem(rng, order, ebn0, block_bits, batch_bits)
+    return totals
+
+def ber_mc(order=4, ebn0=range(0, 11), chain='modem', target_errors=100, max_bits=10**7,
+           batch_bits=2**18, block_bits=1024, N_fft=128, workers=None, seed=0, confidence=0.95):
+    """
+    BER / BLER методом Монте-Карло по сетке Eb/N0
+
+    Каждая точка - пакеты по `batch_bits` бит одним массивом, пока не наберется
+    `target_errors` битовых ошибок или `max_bits` бит. Точки считаются в пуле процессов,
+    у каждой свой поток случайных чисел (SeedSequence(seed).spawn) - результат
+    не зависит от числа процессов.
+
+    Параметры
+    ----------
+        `order`: 4 (qpsk) | 16 | 64 | 256
+
+        `ebn0`: сетка Eb/N0 [дБ]
+
+        `chain`:
+            'modem' - модуляция -> AWGN -> жесткое решение, блок - `block_bits` бит
+
+            'ofdm' - OFDM_MOD.modulation -> AWGN -> fft -> equalize -> verify_slots,
+            блок - слот (ошибка блока - ошибки в битах или CRC), синхронизация идеальная
+
+        `target_errors`: число ошибок для остановки точки
+
+        `max_bits`: максимум бит на точку
+
+        `batch_bits`: бит в одном пакете
+
+        `N_fft`: для chain='ofdm'
+
+        `workers`: число процессов (None - os.cpu_count(), 0 - в этом процессе)
+
+        `seed`: seed для всех точек
+
+        `confidence`: уровень доверительных интервалов (Уилсон)
+
+    Возвращает
+    ----------
+        `res`: dict
+            'ebn0', 'ber', 'bler' - NParray [n_points]
+
+            'ber_ci', 'bler_ci' - NParray [2, n_points] (нижняя и верхняя граница)
+
+            'bits', 'bit_errors', 'blocks', 'block_errors' - счетчики
+    """
+    if chain not in ('modem', 'ofdm'):
+        raise ValueError("chain должен быть 'modem' или 'ofdm'")
+    ebn0 = np.atleast_1d(np.asarray(ebn0, dtype=float))
+    seeds = np.random.SeedSequence(seed).spawn(len(ebn0))
+    tasks = [(s, order, e, chain, target_errors, max_bits, batch_bits, block_bits, N_fft)
+             for s, e in zip(seeds, ebn0)]
+
+    if workers == 0:
+        totals = list(map(_ber_point, tasks))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+            totals = list(pool.map(_ber_point, tasks))
+
+    bits, bit_errors, blocks, block_errors = np.array(totals, dtype=np.int64).reshape(-1, 4).T
+    return {
+        'ebn0': ebn0,
+        'ber': bit_errors / np.maximum(bits, 1),
+        'ber_ci': _wilson(bit_errors, bits, confidence),
+        'bler': block_errors / np.maximum(blocks, 1),
+        'bler_ci': _wilson(block_errors, blocks, confidence),
+        'bits': bits,
+        'bit_errors': bit_errors,
+        'blocks': blocks,
+        'block_errors': block_errors,
+    }
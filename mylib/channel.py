@@ -0,0 +1,158 @@
+"""
+`Канал`
+
+- Channel
+    - filter
+    - resample
+    - impair
+    - apply
+
+"""
+
+import numpy as np
+
+# Длина окна интерполятора (windowed sinc) для дробной задержки и SFO
+_SINC_TAPS = 8
+
+class Channel:
+    """
+    Модель канала: многолучевость -> задержка / SFO -> CFO -> IQ дисбаланс -> AWGN -> int16
+
+    Все операции - над целым блоком (или пачкой блоков [n, L]) без циклов по отсчётам.
+    Случайность только из своего генератора (seed) - результат воспроизводим.
+
+    ch = ml.Channel(snr=20, cfo=1e3, delay=10.5, taps=[1, 0.3j], seed=1)
+
+    rx = ch.apply(tx)
+
+    Параметры
+    ----------
+        `snr`: ОСШ в дБ относительно мощности сигнала (None - без шума)
+
+        `cfo`: сдвиг частоты [Гц]
+
+        `sfo`: сдвиг частоты дискретизации [ppm]
+
+        `delay`: задержка в отсчётах (может быть дробной)
+
+        `taps`: импульсная характеристика многолучевого канала (None - без него)
+
+        `iq_gain`: амплитудный дисбаланс I/Q [дБ]
+
+        `iq_phase`: фазовый дисбаланс I/Q [градусы]
+
+        `gain`: линейное усиление приемника
+
+        `quantize`: округление I/Q до int16 (как отсчёты Pluto)
+
+        `sample_rate`: частота дискретизации [Гц] (для cfo)
+
+        `seed`: seed генератора шума
+    """
+    def __init__(self, snr=None, cfo=0, sfo=0, delay=0, taps=None, iq_gain=0, iq_phase=0,
+                 gain=1, quantize=True, sample_rate=1e6, seed=None):
+        self.snr = snr
+        self.cfo = cfo
+        self.sfo = sfo
+        self.delay = delay
+        self.taps = None if taps is None else np.asarray(taps, dtype=complex)
+        self.iq_gain = iq_gain
+        self.iq_phase = iq_phase
+        self.gain = gain
+        self.quantize = quantize
+        self.sample_rate = sample_rate
+        self.rng = np.random.default_rng(seed)
+
+    def filter(self, x, cyclic=False):
+        """
+        Многолучевость: свертка с `taps` по последней оси (длина не меняется)
+
+        `cyclic`: циклическая свертка (для циклического буфера TX)
+        """
+        x = np.asarray(x, dtype=complex)
+        if self.taps is None:
+            return x
+        y = np.zeros_like(x)
+        n = x.shape[-1]
+        for k, h in enumerate(self.taps):
+            if cyclic:
+                y += h * np.roll(x, k, axis=-1)
+            elif k < n:
+                y[..., k:] += h * x[..., :n - k]
+        return y
+
+    def resample(self, x, t, cyclic=False):
+        """
+        Значения x в моменты `t` (в отсчётах x): windowed sinc на _SINC_TAPS отсчётов
+
+        Вне x - нули (или период x, если `cyclic`). Целые `t` - точная выборка.
+        """
+        x = np.asarray(x)
+        n = x.shape[-1]
+        t = np.asarray(t, dtype=float)
+        i0 = np.floor(t).astype(int)
+        if np.all(t == i0):
+            idx, w = i0, None
+        else:
+            offs = np.arange(1 - _SINC_TAPS // 2, _SINC_TAPS // 2 + 1)
+            d = (t - i0)[:, np.newaxis] - offs
+            w = np.sinc(d) * (0.5 + 0.5 * np.cos(np.pi * d / (_SINC_TAPS // 2)))
+            w /= np.sum(w, axis=1, keepdims=True)
+            idx = i0[:, np.newaxis] + offs
+        if n == 0:
+            vals = np.zeros(x.shape[:-1] + idx.shape, dtype=complex)
+        elif cyclic:
+            vals = x[..., idx % n]
+        else:
+            valid = (idx >= 0) & (idx < n)
+            vals = np.where(valid, x[..., np.clip(idx, 0, n - 1)], 0)
+        if w is None:
+            return vals
+        return np.sum(vals * w, axis=-1)
+
+    def impair(self, y, k, power=1., sample_rate=None):
+        """
+        CFO, IQ дисбаланс, усиление, AWGN и квантование
+
+        Параметры
+        ----------
+            `y`: отсчёты [..., L]
+
+            `k`: номера отсчётов приемника [L] (фаза CFO непрерывна между блоками)
+
+            `power`: мощность сигнала для расчета шума по `snr`
+        """
+        fs = self.sample_rate if sample_rate is None else sample_rate
+        y = np.asarray(y, dtype=complex)
+        if self.cfo:
+            y = y * np.exp(2j * np.pi * self.cfo / fs * np.asarray(k))
+        if self.iq_gain or self.iq_phase:
+            g = 10 ** (self.iq_gain / 20)
+            phi = np.deg2rad(self.iq_phase)
+            mu = (1 + g * np.exp(-1j * phi)) / 2
+            nu = (1 - g * np.exp(1j * phi)) / 2
+            y = mu * y + nu * np.conj(y)
+        if self.gain != 1:
+            y = y * self.gain
+        if self.snr is not None:
+            sigma = np.sqrt(power * self.gain**2 / 10 ** (self.snr / 10) / 2)
+            y = y + sigma * (self.rng.standard_normal(y.shape) + 1j * self.rng.standard_normal(y.shape))
+        if self.quantize:
+            y = np.clip(np.round(y.real), -2**15, 2**15 - 1) + 1j * np.clip(np.round(y.imag), -2**15, 2**15 - 1)
+        return y
+
+    def apply(self, x, power=None):
+        """
+        Весь канал для блока (или пачки блоков [n, L]), длина на выходе та же
+
+        `power`: мощность сигнала для `snr` (по умолчанию - средняя мощность x)
+        """
+        x = np.asarray(x, dtype=complex)
+        L = x.shape[-1]
+        if power is None:
+            power = np.mean(np.abs(x)**2) if x.size else 1.
+        y = self.filter(x)
+        k = np.arange(L)
+        if self.delay or self.sfo:
+            y = self.resample(y, k * (1 + self.sfo * 1e-6) - self.delay)
+        return self.impair(y, k, power)
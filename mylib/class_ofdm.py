@@ -1,9 +1,17 @@
 """
 """
 
+import os
 import numpy as np
-from icecream import ic
+from numpy.lib.stride_tricks import sliding_window_view
 import mylib as ml
+from .base import _corr_valid_fft, _moving_sum, _next_pow2, _pss_norms
+from .ofdm import _period_peaks
+from .modulation import _modem
+from .diag import diag
+from .record import replay_iq
+
+_PILOT_INTERP = {}
 
 class OFDM_MOD:
     """
@@ -118,6 +126,11 @@ class OFDM_MOD:
         pilot_symbols = ones * N_pilot
         return pilot_symbols
 
+    @property
+    def carriers(self):
+        """Карта поднесущих CarrierMap (общая для всех OFDM_MOD с теми же параметрами)"""
+        return ml.carrier_map(self.N_fft, self.GB_len, self.pilot_carriers)
+
     def activ_carriers(self, pilots = False):
         """
         ml.activ_carriers(64, 6, (-21, -7, 7, 21), True)
@@ -126,361 +139,321 @@ class OFDM_MOD:
 
         PC - pilot_carriers
         
-        Возвращает массив поднесущих на которых имеются данные
+        Возвращает массив поднесущих на которых имеются данные (read-only)
+        
+        pilots=True - поднесущие с данными и пилотами
         """
-        fft_len = self.N_fft
-        GB = self.GB_len // 2
-        PilCar = self.pilot_carriers
-
         if pilots:
-            activ = np.array([
-                    i
-                    for i in range(0, fft_len)
-                    if (i in range(GB, fft_len - GB - 1))
-                    and (i != fft_len/2)
-                ])
-        else:
-            activ = np.array([
-                    i
-                    for i in range(0, fft_len)
-                    if (i in range(GB, fft_len - GB - 1))
-                    and (i not in PilCar)
-                    and (i != fft_len/2)
-                ])
-        
-        #activ = activ + (self.N_fft / 2)
-        
-        return activ
+            return self.carriers.used
+        return self.carriers.data
 
-    def modulation(self, amplitude_all=2**14, amplitude_data=1, amplitude_pss=3, amplitude_pilots=3, ravel=True):
+    def slot_size(self):
         """
-        OFDM модуляция.
+        Сколько символов данных помещается в один слот
 
-        Returns:
-            np.ndarray: Массив OFDM-сигналов.
+        Слот - 5 OFDM символов, из них 12 символов заголовка (номер слота, число слотов,
+        длина) и 8 символов CRC
         """
-        # Разделение массива symbols на матрицу(по n в строке)
-        def reshape_symbols(symbols, activ):
-            len_arr = len(activ)
-            try:
-                if (len(symbols) % len_arr) != 0:
-                    symbols1 = np.array_split(symbols[: -(len(symbols) % len_arr)], len(symbols) / len_arr)
-                    symbols2 = np.array((symbols[-(len(symbols) % len_arr) :]))
-                    
-                    ran_bits = ml.gen_rand_bits((len_arr - len(symbols2))*2)
-                    zero_qpsk = list(ml.qpsk(ran_bits, amplitude=1)) # 1+1j 
-                    
-                    zeros_last = np.array(zero_qpsk)
-                    symbols2 = np.concatenate((symbols2, zeros_last))
-                    symbols1.append(symbols2)
-                    symbols = symbols1
-                else:
-                    symbols = np.array_split(symbols, len(symbols) / len_arr)
-            except ValueError:
-                zero = np.zeros(len_arr - len(symbols))
-                symbols = np.concatenate((symbols, zero))
-            
-            return symbols
-
-        def distrib_subcarriers(symbols, activ, fft_len, amplitude):
-            len_symbols = np.shape(symbols)
-            # Создание матрицы, в строчке по n символов QPSK
-            if len(len_symbols) > 1: 
-                arr_symols = np.zeros((len_symbols[0], fft_len), dtype=complex)
-            else: # если данных только 1 OFDM символ
-                arr_symols = np.zeros((1, fft_len), dtype=complex)
-            
-            # Распределение строк символов по OFDM символам(с GB и пилотами)
-            for i, symbol in enumerate(arr_symols):
-                index_pilot = 0
-                index_sym = 0
-                for j in range(len(symbol)):
-                    if j in self.pilot_carriers:
-                        arr_symols[i][j] = self.pilot_symbols[index_pilot] * amplitude
-                        index_pilot += 1
-                    elif (j in activ) and (index_sym < len_symbols[-1]):
-                        if len(len_symbols) > 1:
-                            arr_symols[i][j] = symbols[i][index_sym]
-                        else:
-                            arr_symols[i][j] = symbols[index_sym]
-                        index_sym += 1
-            
-            return arr_symols
-
-        def split_into_slots(symbols, chunk_size):
-            chunks = []
-            sym = list(symbols)
-            # Разбивает `symbols` на фрагменты по `chunk_size`
-            for i in range(0, len(sym), chunk_size):
-                chunks.append(sym[i:i + chunk_size])
-            return chunks
-
-        def to_binary_fixed_length(number, length=8):
-            binary_array = []
-            for i in range(length):
-                bit = number & (1 << (length - i - 1))
-                binary_array.append(bit >> (length - i - 1))
-            return binary_array
-
-        def add_pss(fft_len, symbols, amplitude): 
-            """
-            Добавление PSS 
-            
-            Работает правильно
-            """
-            #len_subcarr = len(self.activ_carriers(True))
-            
-            pss = ml.zadoff_chu(PSS=True) * amplitude
-            arr = np.zeros(fft_len, dtype=complex)
-
-            # Массив с защитными поднесущими и 0 в центре
-            arr[fft_len//2 - 31 : fft_len//2] = pss[:31]
-            arr[fft_len//2 + 1: fft_len//2 + 32] = pss[31:]
-            
-            symbols = np.insert(symbols, 0, arr, axis=0)
-            
-            for i in range(6, symbols.shape[0], 6):
-                symbols = np.insert(symbols, i, arr, axis=0)
+        return len(self.carriers.data) * 5 - 20
 
-            return symbols
+    def _build_slots(self, symbols):
+        """
+        Слоты кадра [номер, всего слотов, длина, данные, CRC, заполнение] одной матрицей
 
-        def add_CRC(slot_pre_post):
-            data = ml.dem_qpsk(slot_pre_post) # Демодуляция по QPSK
-            data = list(data)
-            G = [1,0,1,0,0,1,1,1,0,1,0,0,0,1,0,1] # полином для вычисления crc
+        Возвращает
+        --------
+            `rows`: NParray complex [n_rows, len(activ_carriers())] - строки данных
+                OFDM символов (по 5 на слот)
+        """
+        n_activ = len(self.carriers.data)
+        size = self.slot_size()
+        n_slots = -(-len(symbols) // size)
+        lens = np.full(n_slots, size)
+        lens[-1] = len(symbols) - size * (n_slots - 1)
+        total = lens + 20
+
+        frame = np.zeros((n_slots, 5 * n_activ), dtype=complex)
+        flat = frame[:, 12:12 + size].reshape(-1)
+        flat[:len(symbols)] = symbols
+        frame[:, 12:12 + size] = flat.reshape(n_slots, size)
+
+        # Заголовок: номер слота, число слотов, длина слота с заголовком и CRC (по 8 бит)
+        head = np.empty((n_slots, 3), dtype=np.uint8)
+        head[:, 0] = np.arange(1, n_slots + 1) & 0xFF
+        head[:, 1] = n_slots & 0xFF
+        head[:, 2] = total & 0xFF
+        frame[:, :12] = ml.qpsk(np.unpackbits(head, axis=1).ravel(), amplitude=1).reshape(n_slots, 12)
+
+        # CRC по жестким QPSK решениям заголовка и данных, все слоты сразу
+        # (не зависит от амплитуды QAM_sym; старая версия при амплитуде != 1
+        # теряла заголовок в dem_qpsk - см. README).
+        # Короткий последний слот выравнивается вправо - нули слева не меняют CRC
+        body = frame[:, :12 + size]
+        bits = np.empty((n_slots, body.shape[1] * 2), dtype=np.uint8)
+        bits[:, 0::2] = body.real < 0
+        bits[:, 1::2] = body.imag < 0
+        n_bits = 2 * (12 + lens[-1])
+        if n_bits < bits.shape[1]:
+            bits[-1, -n_bits:] = bits[-1, :n_bits].copy()
+            bits[-1, :-n_bits] = 0
+        crc = ml.qpsk(ml.crc16(bits).ravel(), amplitude=1).reshape(n_slots, 8)
+        frame[np.arange(n_slots)[:, np.newaxis], (12 + lens)[:, np.newaxis] + np.arange(8)] = crc
+
+        # Заполнение хвоста последнего слота: остаток строки и пустые OFDM символы
+        zero_qpsk = ml.qpsk(ml.gen_rand_bits(n_activ * 2), amplitude=1)
+        last, end = frame[-1], total[-1]
+        if end < n_activ:
+            # Слот короче одного OFDM символа - одна строка, дополненная нулями
+            return np.concatenate((frame[:-1].reshape(-1, n_activ), last[np.newaxis, :n_activ]))
+        row_end = -(-end // n_activ) * n_activ
+        last[end:row_end] = zero_qpsk[:row_end - end]
+        last[row_end:].reshape(-1, n_activ)[:] = zero_qpsk
+
+        return frame.reshape(-1, n_activ)
 
-            data_crc = data + 16 * [0]
-            for i in range(0,len(data_crc)-16):
-                if(data_crc[i] == 1):
-                    for j in range(len(G)):
-                        data_crc[i+j] = data_crc[i+j] ^ G[j]
-            crc = data_crc[len(data_crc)-16:]
+    def modulation(self, amplitude_all=2**14, amplitude_data=1, amplitude_pss=3, amplitude_pilots=3, ravel=True):
+        """
+        OFDM модуляция.
 
-            return np.array(crc)
+        Кадр собирается целиком: все слоты одной матрицей, поднесущие раскладываются
+        сразу в порядке np.fft (без fftshift), одно IFFT на все символы, CP срезом.
 
+        Returns:
+            np.ndarray: Массив OFDM-сигналов.
+        """
         fft_len = self.N_fft
-        _cyclic_prefix_len = self.CP_len
-        _guard_band_len = self.GB_len
-        symbols = self.QAM_sym
-        activ = self.activ_carriers()
-    
-        len_prefix_max_slots = int(np.log2(256))
-    
+        cp = self.CP_len
+        carriers = self.carriers
+
         # Нормирование амплитуд
         am_max = np.max([amplitude_data, amplitude_pilots, amplitude_pss])
         amplitude_data = amplitude_data / am_max
         amplitude_pilots = amplitude_pilots / am_max
         amplitude_pss = amplitude_pss / am_max
-            
-        symbols = split_into_slots(symbols, (-len_prefix_max_slots -4 +(len(activ))*5) -8)
-        
-        # Делим массив символов на матрицу (в строке элеметнов = доступных поднесущих)
-        slots = []
-        for slot, i in zip(symbols, range(len(symbols))):
-            # Заполнение префикса
-            slot_number = ml.qpsk(to_binary_fixed_length(i+1, len_prefix_max_slots), amplitude=1)
-            total_slots = ml.qpsk(to_binary_fixed_length(len(symbols), len_prefix_max_slots), amplitude=1)
-            useful_bits = ml.qpsk(to_binary_fixed_length(len(slot)+8+4+8, 8), amplitude=1)
-            
-            slot_pre_post  = np.concatenate((slot_number, total_slots, useful_bits, slot))
-            # CRC
-            crc = ml.qpsk(add_CRC(slot_pre_post), amplitude=1) 
-            
-            slot_pre_post  = np.concatenate((slot_pre_post, crc))
-            
-            
-            slot_pre_post = reshape_symbols(slot_pre_post, activ) 
-
-            ran_bits = ml.gen_rand_bits(len(activ)*2)
-            zero_qpsk = list(ml.qpsk(ran_bits, amplitude=1)) # 1+1j 
-            # Добавление недостающих OFDM символов для заполнения слота
-            empty_symbol = []
-            for em in range(0, 5 - np.shape(slot_pre_post)[0]):
-                empty_symbol.append(zero_qpsk)
-            if len(empty_symbol) > 0:
-                slot_pre_post = np.concatenate((slot_pre_post, empty_symbol))
-            
-            #ic(np.shape(slot_pre_post))
-            slots.append(slot_pre_post)
-        
-        slots = np.concatenate(slots, axis=0)
-        
 
+        rows = self._build_slots(np.asarray(self.QAM_sym)) * amplitude_data
+
+        # PSS перед каждыми 5 символами данных
+        n_rows = len(rows)
+        n_pss = 1 + len(range(6, n_rows + 1, 6))
+        is_pss = np.zeros(n_rows + n_pss, dtype=bool)
+        is_pss[np.arange(n_pss) * 6] = True
+
+        pilots = np.unique(carriers.pilots)
+        data = np.zeros((n_rows, fft_len), dtype=complex)
+        data[:, carriers.data_fft] = rows
+        data[:, (pilots + fft_len // 2) % fft_len] = np.asarray(self.pilot_symbols[:len(pilots)]) * amplitude_pilots
+
+        grid = np.empty((len(is_pss), fft_len), dtype=complex)
+        grid[is_pss] = np.fft.fftshift(ml.pss_template(fft_len, domain='grid') * amplitude_pss)
+        grid[~is_pss] = data
+
+        # IFFT и циклический префикс
+        fft_cp = np.empty((len(grid), fft_len + cp), dtype=complex)
+        fft_cp[:, cp:] = np.fft.ifft(grid, axis=1)
+        fft_cp[:, :cp] = fft_cp[:, -cp:]
+        fft_cp *= amplitude_all
 
-        slots = slots * amplitude_data
-        arr_symols = distrib_subcarriers(slots, activ, fft_len, amplitude_pilots)
-        arr_symols = add_pss(fft_len, arr_symols, amplitude_pss)
-        
-        arr_symols = np.fft.fftshift(arr_symols, axes=1)
-        
-        # IFFT
-        ifft = np.zeros((np.shape(arr_symols)[0], fft_len), dtype=complex)
-        for i in range(len(arr_symols)):
-            ifft[i] = np.fft.ifft(arr_symols[i])
-        
-        # Добавление циклического префикса
-        fft_cp = np.zeros((np.shape(arr_symols)[0], (fft_len + _cyclic_prefix_len)), dtype=complex)
-        for i in range(np.shape(arr_symols)[0]):
-            fft_cp[i] = np.concatenate((ifft[i][-_cyclic_prefix_len:], ifft[i]))
-        
-        fft_cp = fft_cp * amplitude_all
-        
         if ravel:
             return np.ravel(fft_cp)
         return fft_cp
 
-    def indexs_of_CP(self, rx):
+    def verify_slots(self, slots):
+        """
+        Разбор заголовков и проверка CRC принятых слотов (обратная сторона modulation)
+
+        Поле длины в заголовке 8 бит, поэтому для слотов длиннее 255 символов
+        перебираются все подходящие длины - верную определяет CRC.
+
+        Параметры
+        ----------
+            `slots`: [n_slots, n] или [n] - символы данных слотов подряд по строкам
+                (после эквалайзера, без PSS и пилотов), обычно n = 5 * len(activ_carriers())
+
+        Возвращает
+        --------
+            `slot_number`: NParray int [n_slots] - номер слота из заголовка
+
+            `total_slots`: NParray int [n_slots] - число слотов в кадре
+
+            `payload`: list из NParray - символы данных каждого слота
+
+            `crc_ok`: NParray bool [n_slots]
         """
-        Возвращает массив начала символов (вместе с CP) (чтобы только символ был нужно index + 16)
+        slots = np.atleast_2d(slots)
+        n_slots, width = slots.shape
+        bits = np.empty((n_slots, 2 * width), dtype=np.uint8)
+        bits[:, 0::2] = slots.real < 0
+        bits[:, 1::2] = slots.imag < 0
+        slot_number, total_slots, useful = np.packbits(bits[:, :24], axis=1).T.astype(int)
+
+        # Кандидаты длины (слот вместе с заголовком и CRC): useful + 256 * k
+        cand = useful[:, np.newaxis] + 256 * np.arange(width // 256 + 1)
+        slot_idx, k = np.nonzero((cand >= 20) & (cand <= width))
+        n_data = 2 * (cand[slot_idx, k] - 8)
+
+        # Все пары (слот, длина) одной матрицей, данные выровнены вправо
+        cols = np.arange(2 * width) - (2 * width - n_data[:, np.newaxis])
+        data = np.where(cols >= 0, bits[slot_idx[:, np.newaxis], np.maximum(cols, 0)], 0).astype(np.uint8)
+        rx_crc = bits[slot_idx[:, np.newaxis], n_data[:, np.newaxis] + np.arange(16)]
+        ok = np.all(ml.crc16(data) == rx_crc, axis=1)
+
+        crc_ok = np.zeros(n_slots, dtype=bool)
+        length = np.full(n_slots, width)
+        first = np.ones(n_slots, dtype=bool)
+        for s, L, good in zip(slot_idx, cand[slot_idx, k], ok):
+            if good and not crc_ok[s] or first[s]:
+                length[s] = L
+                crc_ok[s] |= good
+                first[s] = False
+
+        payload = [slots[s, 12:length[s] - 8] for s in range(n_slots)]
+        return slot_number, total_slots, payload, crc_ok
+
+    def indexs_of_CP(self, rx):
         """
-        from mylib import corr_no_shift
-        cp = self.CP_len
-        fft_len = self.N_fft
-        
-        corr = [] # Массив корреляции 
-        for i in range(len(rx)):
-            o = corr_no_shift(rx[:cp], rx[fft_len:fft_len+cp], complex=True)
-            corr.append(abs(o))
-            rx = np.roll(rx, -1)
-            
-        corr = np.array(corr) / np.max(corr) # Нормирование
+        Возвращает массив начала символов (вместе с CP) (чтобы только символ был нужно index + CP_len)
 
-        if corr[0] > 0.97:
-            max_len_cycle = len(corr)
-        else:
-            max_len_cycle = len(corr)-(fft_len+cp)
-
-        arr_index = [] # Массив индексов максимальных значений corr
-        for i in range(0, max_len_cycle, (fft_len+cp)):
-            #print(i, i+(fft_len+cp))
-            max = np.max(corr[i : i+(fft_len+cp)])
-            if max > 0.9: 
-                ind = i + np.argmax(corr[i : i+(fft_len+cp)])
-                if ind < (len(corr)-(fft_len+cp)):
-                    arr_index.append(ind)
-        
-        ### DEBUG
-        print(arr_index)
-        # print(corr)
-        #from mylib import cool_plot
-        #cool_plot(corr, title='corr', show_plot=False)
-        
-        return arr_index
+        Метрика CP (ml.cp_timing_metric) за O(N), по одному пику на период символа
+        выше 0.9 от максимума. Только символы, целиком попавшие в rx.
+        """
+        metric, _ = ml.cp_timing_metric(rx, self.N_fft, self.CP_len)
+        diag('corr', metric)
+        return _period_peaks(metric, self.N_fft + self.CP_len, 0.9)
 
     def indexs_of_CP_after_PSS(self, rx):
         """
-        Возвращает массив начала символов (вместе с CP) (чтобы только символ был нужно index + 16)
+        Возвращает массив начала символов (вместе с CP) (чтобы только символ был нужно index + CP_len)
+
+        rx начинается с PSS: первый индекс - максимум метрики на первой половине
+        периода, дальше по одному пику на период (со сдвигом на полпериода)
         """
-        from mylib import corr_no_shift
-        cp = self.CP_len
-        fft_len = self.N_fft
+        sym_len = self.N_fft + self.CP_len
+        metric, _ = ml.cp_timing_metric(rx, self.N_fft, self.CP_len)
+        diag('corr afte PSS', metric)
+        return _period_peaks(metric, sym_len, 0.9, offset=sym_len // 2)
+
+    def _pss_metric(self, rx, roots=(25,), domain='symbol'):
+        """
+        Согласованный фильтр PSS: |<x, pss>| / (||x|| ||pss||) для всех сдвигов
         
-        corr = [] # Массив корреляции 
-        for i in range(len(rx) - fft_len):
-            o = corr_no_shift(rx[:cp], rx[fft_len:fft_len+cp], complex=True)
-            corr.append(abs(o))
-            rx = np.roll(rx, -1)
+        Стек спектров шаблонов и их нормы считаются один раз на (корни, N_fft, nfft)
+        и берутся из кэша, корреляция - FFT (overlap-save для длинных записей),
+        энергия окна - скользящей суммой.
+
+        Возвращает
+        ----------
+            `corr`: np.ndarray [len(roots), len(rx) - M + 1], M - длина шаблона
+        """
+        # int16 и т.п.: |rx|^2 переполняется в целом типе
+        rx = np.asarray(rx, dtype=np.result_type(rx, np.complex64))
+        roots = tuple(roots)
+        ref = ml.pss_template(self.N_fft, roots[0], domain)
+        M = len(ref)
+        if len(rx) < M:
+            raise ValueError("Длина rx меньше длины PSS")
+        nfft = min(max(_next_pow2(8 * M), 1024), _next_pow2(len(rx)))
+        nfft = max(nfft, _next_pow2(M))
+        H = ml.pss_template_fft(self.N_fft, nfft, roots, domain)
+
+        corr = np.abs(_corr_valid_fft(rx, ref, H=H))
+        power = np.abs(rx)**2
+        energy = _moving_sum(power, M)
+        tol = 64 * np.finfo(np.float64).eps * np.sum(power)
+        den = np.sqrt(np.maximum(energy, 0)) * _pss_norms(self.N_fft, roots, domain)[:, np.newaxis]
+        return np.divide(corr, den, out=np.zeros_like(corr), where=energy > tol)
+
+    def _pss_peaks(self, corr, threshold):
+        """
+        Все пики метрики PSS выше threshold * max (не ближе символа друг к другу)
+        """
+        sym_len = self.N_fft + self.CP_len
+        pos = _period_peaks(corr, sym_len, threshold)
+        # Пики соседних периодов ближе символа - один и тот же PSS, остается больший
+        close = np.flatnonzero(np.diff(pos) < sym_len)
+        drop = np.where(corr[pos[close]] < corr[pos[close + 1]], close, close + 1)
+        return np.delete(pos, drop)
+
+    def corr_pss_time(self, rx, threshold=0.9):
+        """
+        Поиск PSS во временной области (согласованный фильтр через FFT)
+
+        Шаблон - весь символ PSS (N_fft отсчётов), а не 63 отсчёта из него:
+        короткий кусок узкополосного PSS при больших N_fft похож на любой сигнал
+
+        Параметры
+        ----------
+            `rx`: принятый сигнал
             
-        corr = np.array(corr) / np.max(corr) # Нормирование
-        max_len_cycle = len(corr)
-        # if corr[0] > 0.97:
-        #     max_len_cycle = len(corr)
-        # else:
-        #     max_len_cycle = len(corr)-(fft_len+cp)
-
-        ind = np.argmax(corr[0 : (fft_len+cp)// 2 ])
-        arr_index = [] # Массив индексов максимальных значений corr
-        arr_index.append(ind)
-        for i in range((fft_len+cp) // 2, max_len_cycle, (fft_len+cp)):
-            #print(i, i+(fft_len+cp))
-            max = np.max(corr[i : i+(fft_len+cp)])
-            if max > 0.9: 
-                ind = i + np.argmax(corr[i : i+(fft_len+cp)])
-                if ind < (len(corr)):
-                    arr_index.append(ind)
-        
-        ### DEBUG
-        print(arr_index)
-        # print(corr)
-        #from mylib import cool_plot
-        #cool_plot(corr, title='corr afte PSS', show_plot=False)
-        
-        return arr_index
+            `threshold`: порог от максимума нормированной корреляции
 
-    def corr_pss_time(self, rx):
+        Возвращает
+        ----------
+            `index`: np.ndarray - начала всех PSS символов (вместе с CP);
+                PSS, чей CP не поместился в rx (пик < CP_len), не возвращаются
         """
+        corr = self._pss_metric(rx)[0]
+        diag('corr_pss_time', corr)
+        peaks = self._pss_peaks(corr, threshold)
+        return peaks[peaks >= self.CP_len] - self.CP_len
+
+    def corr_pss_freq(self, rx, threshold=0.9):
         """
-        from mylib import corr_no_shift
-        cp = self.CP_len
-        fft_len = self.N_fft
-        pss = ml.zadoff_chu(PSS = True)
-        
-        zeros = fft_len // 2 - 31
-        pss_ifft = np.insert(pss, 32, 0)
-        pss_ifft = np.insert(pss_ifft, 0, np.zeros(zeros))
-        pss_ifft = np.append(pss_ifft, np.zeros(zeros-1))
-        
-        pss_ifft = np.fft.fftshift(pss_ifft)
-        pss_ifft = np.fft.ifft(pss_ifft)
-        pss_if = pss_ifft[33:96]
-        
-        corr = [] # Массив корреляции 
-        for i in range(len(rx) - 63):
-            o = corr_no_shift(rx[i : i+63], pss_if, complex=True)
-            corr.append(abs(o))
-        
-        corr = np.array(corr) / np.max(corr)
-        #ml.cool_plot(corr, show_plot=True)
-        #maxi = np.argmax(corr)
-        for i in range(len(corr)):
-            if corr[i] > 0.98:
-                maxi = i
-                break
-        maxi = maxi - 31 - cp-2
-        #print('corr_pss_time',maxi)
-        from mylib import cool_plot
-        cool_plot(corr, title='corr_pss_time', show_plot=False)
-        
-        #rx = rx[maxi:maxi + (self.N_fft + self.CP_len) * 6]
-        
-        return maxi
+        Поиск PSS по шаблону в частотной области (согласованный фильтр через FFT)
 
-    def corr_pss_freq(self, rx):
+        Возвращает
+        ----------
+            `index`: np.ndarray - позиции всех найденных PSS (пик - 33, только >= 0)
         """
+        corr = self._pss_metric(rx, domain='freq')[0]
+        diag('corr_pss_freq', corr)
+        peaks = self._pss_peaks(corr, threshold)
+        return peaks[peaks >= 33] - 33
+
+    def corr_pss_multi(self, rx, roots=(25, 29, 34), threshold=0.5):
         """
-        from mylib import corr_no_shift
-        cp = self.CP_len
-        fft_len = self.N_fft
-        pss = ml.zadoff_chu(PSS = True)
-        
-        zeros = fft_len // 2 - 31
-        pss_ifft = np.insert(pss, 32, 0)
-        
-        corr = [] # Массив корреляции 
-        for i in range(len(rx) - 63):
-            o = corr_no_shift(rx[i : i+63], pss_ifft, complex=True)
-            corr.append(abs(o))
-        
-        corr = np.array(corr) / np.max(corr)
-        
-        #maxi = np.argmax(corr)
-        for i in range(len(corr)):
-            if corr[i] > 0.95:
-                maxi = i
-                break
-        maxi = maxi - 33
-        print('corr_pss_freq',maxi)
-        #from mylib import cool_plot
-        #cool_plot(corr, title='corr_pss_freq', show_plot=False)
+        Поиск PSS сразу для нескольких корней ZC за один проход
         
-        rx = rx[maxi:maxi + (self.N_fft + self.CP_len) * 6]
+        FFT входа считается один раз и умножается на стек спектров всех корней
+        (согласованный фильтр, overlap-save), нормирование - по энергии окна.
+
+        Параметры
+        ----------
+            `rx`: принятый сигнал
+            
+            `roots`: корни ZC, по умолчанию (25, 29, 34)
+            
+            `threshold`: минимальная нормированная корреляция, ниже - корня нет в rx
+
+        Возвращает
+        ----------
+            `peaks`: np.ndarray [len(roots)] 
+                начало PSS символа (вместе с CP) для каждого корня, как в corr_pss_time;
+                -1 - корень не найден (метрика ниже `threshold` или CP не поместился в rx)
+                
+            `metrics`: np.ndarray [len(roots)]
+                нормированная корреляция |<x, pss>| / (||x|| ||pss||) в пике
+                
+            `N_ID`: int
+                индекс корня с наибольшей метрикой (для 25/29/34 это N_ID_2 = 0/1/2)
+        """
+        corr = self._pss_metric(rx, roots)
+
+        # Только пики, перед которыми целиком есть CP
+        cp = self.CP_len
+        if corr.shape[1] <= cp:
+            metrics = corr.max(axis=1)
+            return np.full(len(roots), -1), metrics, int(np.argmax(metrics))
+        pos = cp + np.argmax(corr[:, cp:], axis=1)
+        metrics = corr[np.arange(len(corr)), pos]
+        peaks = np.where(metrics >= threshold, pos - cp, -1)
+        N_ID = int(np.argmax(metrics))
         
-        return rx
+        return peaks, metrics, N_ID
 
     def correct_frequency_offset(self, signal):
         def frequency_offset_estimation(rx, index_pss, sample_rate):
-            received_pss = ml.zadoff_chu(PSS=True)
-            received_pss = np.insert(received_pss, 32, 0)
+            received_pss = ml.pss_template(self.N_fft, domain='freq')
             expected_pss = rx[index_pss:index_pss + 63]
             phase_difference = np.angle(np.dot(received_pss, np.conj(expected_pss)))
             # Time duration for transmitting PSS, in seconds
@@ -491,7 +464,7 @@ class OFDM_MOD:
             return frequency_offset
         
         sample_rate = self.N_fft * 15000
-        index_pss = self.corr_pss_time(signal)
+        index_pss = self.corr_pss_time(signal)[0]
         frequency_offset = frequency_offset_estimation(signal, index_pss, sample_rate)
         #ic(frequency_offset)
         signal = np.array(signal, dtype=np.complex128)
@@ -503,40 +476,59 @@ class OFDM_MOD:
         return corrected_signal
 
 
-    def freq_syn(self, ofdm, indexs):
+    def freq_syn(self, ofdm, indexs, smooth=None, return_cfo=False):
         """
-        Реализует синхронизацию частоты с помощью оценки фазы на основе корреляции.
+        Реализует синхронизацию частоты с помощью оценки фазы на основе корреляции CP.
+
+        Дробный CFO оценивается сразу для всех символов: eps = -angle(sum(CP * conj(хвост))) / 2pi
+        (в долях поднесущей), фаза компенсируется одним умножением матрицы символов
+        [n_sym, N_fft + CP] на exp(-1j * 2pi * eps * i / N_fft).
 
         Args:
-            ofdm (numpy.ndarray): Принятый OFDM-сигнал в частотной области.
-            indexs (list): Список индексов, указывающих начальные точки символов,
-                        которые будут использоваться для синхронизации частоты.
+            ofdm (numpy.ndarray): Принятый OFDM-сигнал во временной области.
+                Комплексный ndarray (в т.ч. complex64) исправляется на месте.
+            indexs (list): Индексы начала символов (вместе с CP).
+            smooth (None | int | 'all'): Сглаживание оценок по символам -
+                скользящее среднее корреляции по `smooth` символам или одна оценка на все.
+            return_cfo (bool): Вернуть еще оценки eps для каждого символа.
 
         Returns:
-            numpy.ndarray: OFDM-сигнал с синхронизированной частотой.
+            numpy.ndarray: OFDM-сигнал с синхронизированной частотой
+            (и eps [n_sym], если return_cfo).
         """
-
         cp = self.CP_len  # Длина циклического префикса
         all_sym = self.N_fft + cp  # Общая длина символа (включая CP)
-
-        for ind in indexs:
-            # Нормализация первого и второго циклических префиксов (CP)
-            fir = (ofdm[ind:ind + cp] / np.abs(ofdm[ind:ind + cp])).flatten()
-            sec = (ofdm[ind + all_sym - cp:ind + all_sym] / np.abs(ofdm[ind + all_sym - cp:ind + all_sym])).flatten()
-
-            # Расчет фазового сдвига с помощью нормированной кросс-корреляции
-            eps = (1 / (2 * np.pi)) * np.sum(fir * sec.conj())  # Сопряженное для комплексной корреляции
-
-            # Коррекция фазы для всех отсчетов в пределах символа
-            for i in range(all_sym):
-                ofdm[ind + i] *= np.exp(-1j * 2 * np.pi * eps * i / self.N_fft)
-
+        if not (isinstance(ofdm, np.ndarray) and np.iscomplexobj(ofdm)):
+            ofdm = np.array(ofdm, dtype=complex)
+        indexs = np.asarray(indexs, dtype=int)
+
+        # Матрица символов с CP: view, если символы идут подряд, иначе выборка
+        regular = len(indexs) > 0 and np.all(np.diff(indexs) == all_sym)
+        if regular:
+            sym = ofdm[indexs[0]:indexs[0] + len(indexs) * all_sym].reshape(-1, all_sym)
+        else:
+            sym = ofdm[indexs[:, np.newaxis] + np.arange(all_sym)]
+
+        gamma = np.sum(sym[:, :cp] * np.conj(sym[:, self.N_fft:]), axis=1)
+        if smooth == 'all':
+            gamma = np.full(len(gamma), np.sum(gamma))
+        elif smooth:
+            gamma = np.convolve(gamma, np.ones(int(smooth)), mode='same')
+        eps = -np.angle(gamma) / (2 * np.pi)
+
+        ramp = np.exp(-1j * 2 * np.pi / self.N_fft * np.outer(eps, np.arange(all_sym)))
+        sym *= ramp.astype(ofdm.dtype, copy=False)
+        if not regular:
+            ofdm[indexs[:, np.newaxis] + np.arange(all_sym)] = sym
+
+        if return_cfo:
+            return ofdm, eps
         return ofdm
 
     def indiv_symbols(self, ofdm, pss=True):
-        cp = self.CP_len
-        all_sym = self.N_fft + cp
-        
+        """
+        Матрица принятых символов без CP [n_sym, N_fft] (view на ofdm, если символы идут подряд)
+        """
         if pss:
             index = self.indexs_of_CP_after_PSS(ofdm)
         else:
@@ -544,144 +536,176 @@ class OFDM_MOD:
         #ic(index)
         #ofdm = self.freq_syn(ofdm, index)
         
-        symbols = []
-        for ind in index:
-            symbols.append(ofdm[ind+cp : ind+all_sym])
+        return self._symbols_view(ofdm, index)
+
+    def _symbols_view(self, ofdm, index):
+        """
+        Матрица символов без CP [n_sym, N_fft] по индексам начала символов (с CP)
+
+        Если символы идут подряд (шаг N_fft + CP_len) - strided view на ofdm без копирования,
+        иначе - выборка по индексам
+        """
+        cp = self.CP_len
+        all_sym = self.N_fft + cp
+        ofdm = np.asarray(ofdm)
+        index = np.asarray(index, dtype=int)
+        if len(index) == 0:
+            return np.empty((0, self.N_fft), dtype=ofdm.dtype)
+        if np.all(np.diff(index) == all_sym):
+            start = index[0] + cp
+            return sliding_window_view(ofdm[start:start + len(index) * all_sym], self.N_fft)[::all_sym]
+        return ofdm[index[:, np.newaxis] + cp + np.arange(self.N_fft)]
+
+    def fft(self, ofdm_symbols, ravel = True, GB = False, pilots = True, dtype = None, out = None):
+        """
+        FFT принятых символов: одно FFT по оси 1 для всей матрицы [n_sym, N_fft]
+
+        fftshift и выбор поднесущих - одна выборка по готовым индексам CarrierMap
+
+        Параметры
+        ----------
+            `ofdm_symbols`: [n_sym, N_fft] или [N_fft] - символы без CP
             
-        return symbols
-
-    def fft(self, ofdm_symbols, ravel = True, GB = False, pilots = True):
-        fft = []
-        len_c = np.shape(ofdm_symbols)[0]
-        for i in range(len_c):
-            if len_c == 1:
-                zn = np.fft.fftshift(np.fft.fft(ofdm_symbols))
-            else:
-                zn = np.fft.fftshift(np.fft.fft(ofdm_symbols[i]))
-                
-            if (GB is False) and (pilots is False):
-                zn = zn[self.activ_carriers()]
-            elif (GB is True):
-                pass
-            else:
-                zn = zn[self.activ_carriers(True)]
-                
-            fft.append(zn)
-                
-        if ravel:
-            ret = np.ravel(fft)
-            return ret
+            `ravel`: True - одномерный массив, False - матрица [n_sym, n_sc]
+            
+            `GB`: True - все N_fft поднесущих (после fftshift)
+            
+            `pilots`: True - данные и пилоты, False - только данные
+            
+            `dtype`: тип результата (например np.complex64)
+            
+            `out`: готовый массив [n_sym, n_sc] для результата
+
+        Возвращает
+        --------
+            `fft`: NParray (непрерывный) [n_sym * n_sc] или [n_sym, n_sc]
+        """
+        carriers = self.carriers
+        if GB is True:
+            idx = (np.arange(self.N_fft) + self.N_fft // 2) % self.N_fft
+        elif pilots:
+            idx = carriers.used_fft
         else:
-            return fft  
-    
-    def interpol_pilots_test(self, ofdm_symbols):
-        # Индексы пилотов, без защитных поднесущих
-        ind_pilots = self.pilot_carriers - self.GB_len // 2
-        for i in range(len(ind_pilots)//2, len(ind_pilots)):
-            ind_pilots[i] -= 1
-        print(ind_pilots)
-        # Вычисление ФФТ
-        rx_fft = self.fft(ofdm_symbols, GB=False)
-        # Преобразование ФФТ в массив символов
-        fft_symbols = np.reshape(rx_fft, (-1, self.N_fft - self.GB_len + 1))
-
-        arr = []
-        for sym in fft_symbols:
-            Hls = sym[ind_pilots] / (1+1j)
-            arr.append(Hls)
+            idx = carriers.data_fft
+
+        spec = np.fft.fft(np.atleast_2d(ofdm_symbols), axis=1)
+        if out is None:
+            out = np.empty((len(spec), len(idx)), dtype=dtype or spec.dtype)
+        if out.dtype == spec.dtype:
+            np.take(spec, idx, axis=1, out=out)
+        else:
+            out[...] = spec[:, idx]
+
+        if ravel:
+            return out.reshape(-1)
+        return out
+
+    def _pilot_interp(self):
+        """
+        Позиции пилотов и данных среди используемых поднесущих (fft(..., pilots=True))
+        и матрица линейной интерполяции W [n_used, n_pilots]: H = H_pilots @ W.T
+
+        Считается один раз на (N_fft, GB, пилоты)
+        """
+        key = (self.N_fft, self.GB_len, tuple(np.ravel(self.pilot_carriers)))
+        if key not in _PILOT_INTERP:
+            used = self.carriers.used
+            pilots = np.unique(self.carriers.pilots)
+            pilots = pilots[np.isin(pilots, used)]
+            W = np.stack([np.interp(used, pilots, e) for e in np.eye(len(pilots))], axis=1)
+            maps = (np.searchsorted(used, pilots), np.searchsorted(used, self.carriers.data), W)
+            for arr in maps:
+                arr.flags.writeable = False
+            _PILOT_INTERP[key] = maps
+        return _PILOT_INTERP[key]
+
+    def equalize(self, fft_used, method='zf', time_avg=None, pilot_gain=3, dtype=None):
+        """
+        Оценка канала по пилотам и эквалайзер сразу для всей сетки [n_sym, n_used]
+
+        LS оценка на пилотах, линейная интерполяция на поднесущие данных одним
+        матричным умножением, ZF или MMSE одной операцией над всей сеткой.
+        Дисперсия шума оценивается по разности LS оценок соседних символов
+        (для одного символа - по отклонению пилота от среднего соседей).
+
+        Параметры
+        ----------
+            `fft_used`: [n_sym, n_used] или [n_used] - fft(..., ravel=False) с пилотами (без PSS)
             
-        H_pil = np.ravel(arr)
-        H_pil = np.reshape(H_pil, (-1, len(self.pilot_carriers)))
-        print(np.shape(H_pil))
-        arr_interp = []
-        x = np.arange(0, ind_pilots[-1])
-        for n_pil in H_pil:
-            inter = np.interp(x, ind_pilots, n_pil)
-            arr_interp.append(inter)
+            `method`: 'zf' | 'mmse'
             
-        ml.cool_plot(np.ravel(arr))
-        ml.cool_plot(np.ravel(arr_interp))
-        #ml.cool_plot(np.ravel(arr_interp))
-        rotated_symbols = []
-        #phase = np.angle(np.ravel(arr_interp))
-        #ic(phase)
-        for sym, interp in zip(rx_fft, arr_interp):
-            a = sym / (interp)
-            rotated_symbols.append(a)
-            # a = sym * np.exp(-1j * phase)
-            # rotated_symbols.append(a)
-        #rotated_symbols = ofdm_symbols * np.ravel(arr_interp)
-        # import matplotlib.pyplot as plt
-        # plt.figure(1)
-        # plt.plot(phase)
-        
-        
-        #ml.cool_plot(np.ravel(rotated_symbols), title="Rotated symbols")
-        ml.cool_scatter(np.ravel(rotated_symbols), title="Rotated symbols")
-        
-    
-    def interpol_pilots(self, ofdm_symbols):
-        # Индексы пилотов
-        ind_pilots = self.pilot_carriers - self.GB_len // 2
-        for i in range(len(ind_pilots)//2, len(ind_pilots)):
-            ind_pilots[i] -= 1
-        # Вычисление ФФТ
-        rx_fft = self.fft(ofdm_symbols, GB=False)
-        ml.cool_scatter(rx_fft)
-        ml.cool_plot(rx_fft)
-        # Преобразование ФФТ в массив символов
-        fft_symbols = np.reshape(rx_fft, (-1, self.N_fft - self.GB_len + 1))
-
-        # Интерполяция фаз пилотов
-        interpolated_phases = []
-        for sym in fft_symbols:
-            phase_pil = np.angle(sym[ind_pilots]) - np.angle(1 + 1j)
-            interpolated_phase = []
-            for i in range(len(ind_pilots) - 1):
-                # Интерполяция между фазами соседних пилотов
-                ad = np.linspace(phase_pil[i], phase_pil[i + 1],
-                                ind_pilots[i + 1] - ind_pilots[i] + 1)
-                interpolated_phase.extend(ad)
-            interpolated_phases.append(interpolated_phase)
-
-        # Интерполяция амплитуды пилотов
-        interpolated_amplitudes = []
-        for sym in fft_symbols:
-            amp_pil = sym[ind_pilots]
-            interpolated_amp = []
-            for i in range(len(ind_pilots) - 1):
-                # Интерполяция между фазами соседних пилотов
-                ad = np.linspace(amp_pil[i], amp_pil[i + 1],
-                                ind_pilots[i + 1] - ind_pilots[i] + 1)
-                interpolated_amp.extend(ad)
-            interpolated_amplitudes.append(interpolated_amp)
-        
-        for i in range(len(interpolated_phases)):
-            interpolated_phases[i] = interpolated_phases[i][:len(fft_symbols[0])]
-        # import matplotlib.pyplot as plt
-        # plt.figure(22)
-        # plt.plot(np.ravel(interpolated_amplitudes))
-        # plt.figure(21)
-        # plt.plot(np.ravel(interpolated_phases))
-        # plt.show()
-        # Развертка символов по углам пилотов
-        rotated_symbols = []
-        for sym, phase, amp in zip(fft_symbols, interpolated_phases, interpolated_amplitudes):
-            rotated_symbol = sym * np.exp(-1j * np.array(phase))
-            # Добавление коррекции по амплитуде
-            amplitude_correction = amp# / np.abs(rotated_symbol[ind_pilots])
-            #rotated_symbol *= amplitude_correction
-            rotated_symbols.append(rotated_symbol)
-
-        ml.cool_plot(np.ravel(rotated_symbols))
-        return np.ravel(rotated_symbols)[self.N_fft - self.GB_len + 1:]
+            `time_avg`: None | int | 'all' - усреднение оценок канала по `time_avg`
+                соседним символам или по всем
+            
+            `pilot_gain`: амплитуда пилотов относительно данных
+                (amplitude_pilots / amplitude_data в modulation)
+            
+            `dtype`: тип символов на выходе (например np.complex64)
+
+        Возвращает
+        --------
+            `data`: NParray [n_sym, n_data] - символы данных после эквалайзера
+            
+            `noise_var`: NParray [n_sym, n_data] - дисперсия шума каждого символа
+                после эквалайзера (для dem_soft / llr)
+        """
+        if method not in ('zf', 'mmse'):
+            raise ValueError("method должен быть 'zf' или 'mmse'")
+        Y = np.atleast_2d(fft_used)
+        pil_pos, data_pos, W = self._pilot_interp()
+        Xp = np.asarray(self.pilot_symbols[:len(pil_pos)]) * pilot_gain
+
+        # LS оценка на пилотах
+        Hp = Y[:, pil_pos] / Xp
+        if len(Hp) > 1:
+            var_p = np.mean(np.abs(np.diff(Hp, axis=0))**2, axis=0) / 2
+        else:
+            # x - (a + b) / 2 имеет дисперсию 1.5 sigma^2
+            res = Hp[0, 1:-1] - (Hp[0, :-2] + Hp[0, 2:]) / 2
+            var_p = np.full(Hp.shape[1], np.mean(np.abs(res)**2) / 1.5 if len(res) else 0.)
+
+        if time_avg == 'all':
+            Hp = np.broadcast_to(np.mean(Hp, axis=0), Hp.shape)
+        elif time_avg:
+            k = int(time_avg)
+            Hp = np.pad(Hp, ((k // 2, k - 1 - k // 2), (0, 0)), mode='edge')
+            Hp = _moving_sum(Hp.T, k).T / k
+
+        # Интерполяция на поднесущие данных
+        Wd = W[data_pos]
+        H = Hp @ Wd.T
+        sigma2 = (var_p * np.abs(Xp)**2) @ Wd.T
+        H2 = np.abs(H)**2
+
+        Yd = Y[:, data_pos]
+        if method == 'zf':
+            data = Yd / H
+            noise_var = sigma2 / H2
+        else:
+            den = H2 + sigma2
+            data = np.conj(H) * Yd / den
+            noise_var = sigma2 / den
+        return data.astype(dtype or data.dtype, copy=False), noise_var
+
+    def interpol_pilots(self, ofdm_symbols, method='zf', time_avg=None):
+        """
+        Эквалайзер по пилотам для символов после indiv_symbols (rx начинается с PSS)
 
+        Символы PSS (каждый 6-й, начиная с первого) пропускаются
 
+        Возвращает символы данных после эквалайзера одним массивом
+        """
+        rx_fft = self.fft(ofdm_symbols, ravel=False)
+        rx_fft = rx_fft[np.arange(len(rx_fft)) % 6 != 0]
+        diag('interpol_pilots', rx_fft, 'scatter')
+        data, _ = self.equalize(rx_fft, method, time_avg)
+        diag('Rotated symbols', data, 'scatter')
+        return np.ravel(data)
 
     def del_pilots(self, rotated_symbols):
         maxi = np.abs(np.max(rotated_symbols))
         rotated_symbols_maxi = np.array(rotated_symbols) / maxi * 3 
-        ml.cool_scatter(rotated_symbols_maxi)
+        diag('del_pilots', rotated_symbols_maxi, 'scatter')
         #ml.cool_plot(abs(rotated_symbols_maxi))
         out = []
         for i in range(len(rotated_symbols_maxi)):
@@ -733,15 +757,309 @@ class OFDM_MOD:
 
     
     def final_rx(self, rx, num_slots = 1):
-        maxi = self.corr_pss_time(rx)
-        ic(maxi)
+        """
+        Прием `num_slots` слотов с первого PSS в rx: символы, FFT, эквалайзер по пилотам
+
+        Возвращаемое значение изменилось: раньше - выход del_pilots (символы / max * 3,
+        отобранные по модулю 0.2..1.5), теперь - символы данных после interpol_pilots
+        (equalize) подряд, без пилотов и PSS, в масштабе созвездия. Прежняя версия
+        на этом пути падала с ошибкой reshape, так что рабочих вызовов со старым
+        форматом не было.
+
+        Возвращает
+        --------
+            `data`: NParray complex [5 * num_slots * len(activ_carriers())]
+        """
+        maxi = self.corr_pss_time(rx)[0]
+        diag('final_rx maxi', maxi, 'print')
         rx = rx[maxi:maxi + (self.N_fft + self.CP_len)*6 * num_slots]
         #rx = rx[maxi:maxi + (self.N_fft + self.CP_len)*6 * num_slots]
         rx_synс = self.indiv_symbols(rx)
         #ic(self.pilot_carriers)
         #ml.cool_plot(np.ravel(rx_synс))
         fft_rx_inter = self.interpol_pilots(rx_synс)
-        self.interpol_pilots_test(rx_synс)
-        fft_rx_del_pilots = self.del_pilots(fft_rx_inter)
         
-        return fft_rx_del_pilots
\ No newline at end of file
+        return fft_rx_inter
+
+    def decode_many(self, captures, workers=None, chunksize=1, transport='shm', **rx_kwargs):
+        """
+        Декодирование многих записей в пуле процессов (OFDM_RX на каждую запись)
+
+        Массивы передаются воркерам не pickle, а через один общий буфер
+        (multiprocessing.shared_memory или временный memmap файл), пути к .npy -
+        открываются в воркере через np.load(mmap_mode='r'). OFDM_MOD создается
+        в каждом воркере один раз.
+
+        Параметры
+        ----------
+            `captures`: список массивов IQ и/или путей к .npy или записям ml.IQRecorder
+                (записи читаются блоками через replay_iq - память не зависит от длины)
+            
+            `workers`: число процессов (None - os.cpu_count(), 0 - без пула, в этом процессе)
+            
+            `chunksize`: сколько записей отдается воркеру за раз
+            
+            `transport`: 'shm' | 'memmap' - способ передачи массивов
+            
+            `rx_kwargs`: параметры OFDM_RX (threshold, order, method, cfo_alpha)
+
+        Возвращает
+        --------
+            `results`: list в порядке captures - список слотов
+                (slot_number, total_slots, bits, crc_ok) или исключение, если запись не разобрать
+        """
+        import copy
+        import tempfile
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import shared_memory
+
+        if transport not in ('shm', 'memmap'):
+            raise ValueError("transport должен быть 'shm' или 'memmap'")
+
+        # Все массивы - подряд в один буфер, воркерам только (offset, length)
+        tasks, arrays, offset = [], [], 0
+        for i, c in enumerate(captures):
+            if isinstance(c, (str, os.PathLike)):
+                tasks.append((i, 'file', os.fspath(c), 0))
+                continue
+            c = np.asarray(c)
+            if c.ndim != 1 or not np.issubdtype(c.dtype, np.number):
+                tasks.append((i, 'error', ValueError(f"Запись {i}: нужен одномерный массив IQ"), 0))
+                continue
+            arrays.append(c)
+            tasks.append((i, 'buf', offset, len(c)))
+            offset += len(c)
+        dtype = np.result_type(np.complex64, *[a.dtype for a in arrays])
+
+        mod = copy.copy(self)
+        mod.QAM_sym = None
+        shm, path, buf = None, None, None
+        try:
+            if offset:
+                nbytes = offset * dtype.itemsize
+                if transport == 'shm':
+                    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+                    view = np.ndarray(offset, dtype=dtype, buffer=shm.buf)
+                    buf = ('shm', shm.name, dtype.str, offset)
+                else:
+                    fd, path = tempfile.mkstemp(suffix='.iq')
+                    os.close(fd)
+                    view = np.memmap(path, dtype=dtype, mode='w+', shape=offset)
+                    buf = ('memmap', path, dtype.str, offset)
+                pos = 0
+                for a in arrays:
+                    view[pos:pos + len(a)] = a
+                    pos += len(a)
+                if transport == 'memmap':
+                    view.flush()
+                del view
+
+            chunks = [tasks[i:i + chunksize] for i in range(0, len(tasks), max(1, chunksize))]
+            if workers == 0:
+                _decode_init(mod, rx_kwargs, buf)
+                parts = map(_decode_chunk, chunks)
+                results = [r for part in parts for r in part]
+                _decode_close()
+            else:
+                with ProcessPoolExecutor(workers or os.cpu_count(), initializer=_decode_init,
+                                         initargs=(mod, rx_kwargs, buf)) as pool:
+                    results = [r for part in pool.map(_decode_chunk, chunks) for r in part]
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+            if path is not None:
+                os.remove(path)
+        return results
+
+
+# Состояние воркера decode_many: OFDM_MOD, параметры OFDM_RX, общий буфер
+_DECODE_STATE = {}
+
+def _decode_init(mod, rx_kwargs, buf):
+    _DECODE_STATE.update(mod=mod, rx_kwargs=rx_kwargs, shm=None, data=None)
+    if buf is None:
+        return
+    kind, name, dtype, size = buf
+    if kind == 'shm':
+        from multiprocessing import shared_memory
+        shm = shared_memory.SharedMemory(name=name)
+        _DECODE_STATE['shm'] = shm
+        _DECODE_STATE['data'] = np.ndarray(size, dtype=dtype, buffer=shm.buf)
+    else:
+        _DECODE_STATE['data'] = np.memmap(name, dtype=dtype, mode='r', shape=size)
+
+def _decode_close():
+    _DECODE_STATE['data'] = None
+    if _DECODE_STATE.get('shm') is not None:
+        _DECODE_STATE['shm'].close()
+    _DECODE_STATE.clear()
+
+def _decode_chunk(tasks):
+    mod, rx_kwargs = _DECODE_STATE['mod'], _DECODE_STATE['rx_kwargs']
+    results = []
+    for _, kind, src, length in tasks:
+        try:
+            if kind == 'error':
+                raise src
+            receiver = OFDM_RX(mod, **rx_kwargs)
+            if kind == 'file' and os.path.exists(src + '.json'):
+                slots = []
+                for chunk in replay_iq(src, 2**20):
+                    slots += receiver.push(chunk)
+                results.append(slots)
+                continue
+            if kind == 'file':
+                rx = np.load(src, mmap_mode='r')
+            else:
+                rx = _DECODE_STATE['data'][src:src + length]
+            results.append(receiver.push(rx))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+class OFDM_RX:
+    """
+    Потоковый приемник кадров OFDM_MOD
+
+    Принимает буферы подряд (sdr.rx(), rx_cycles_buffer) и возвращает слоты, как только
+    слот (PSS + 5 символов) принят целиком. Между буферами хранится только хвост
+    (неполный слот или окно поиска PSS), положение слота и оценка CFO - память
+    не растет с длиной потока.
+
+    rx = ml.OFDM_RX(ml.OFDM_MOD(N_fft=128))
+    
+    for _ in range(100):
+        for slot_number, total_slots, bits, crc_ok in rx.push(sdr.rx()):
+            ...
+
+    Параметры
+    ----------
+        `mod`: OFDM_MOD с параметрами передатчика (N_fft, GB, пилоты)
+        
+        `threshold`: порог нормированной корреляции с PSS (0..1)
+        
+        `order`: порядок модуляции данных (4 - QPSK, 16, 64, 256)
+        
+        `method`: эквалайзер 'zf' | 'mmse'
+        
+        `cfo_alpha`: вес предыдущей оценки CFO (0 - только текущий слот)
+    """
+    def __init__(self, mod, threshold=0.6, order=4, method='zf', cfo_alpha=0.5):
+        self.mod = mod
+        self.threshold = threshold
+        self.order = order
+        self.method = method
+        self.cfo_alpha = cfo_alpha
+        self.reset()
+
+    def reset(self):
+        """Сброс состояния: буфер, захват PSS, оценка CFO"""
+        self._buf = np.zeros(0, dtype=complex)
+        self._corr = np.zeros(0)  # метрика PSS для первых len(_corr) позиций _buf
+        self._start = None  # начало следующего слота в _buf (None - поиск PSS)
+        self._gamma = 0j
+        self.cfo = 0.
+
+    def push(self, rx):
+        """
+        Обработка очередного буфера
+
+        Возвращает
+        --------
+            `slots`: list из (slot_number, total_slots, bits, crc_ok) для всех
+                слотов, закончившихся в этом буфере
+        """
+        mod = self.mod
+        cp = mod.CP_len
+        sym_len = mod.N_fft + cp
+        slot_len = 6 * sym_len
+        self._buf = np.concatenate((self._buf, np.asarray(rx, dtype=complex)))
+
+        slots = []
+        while True:
+            if self._start is None:
+                self._start = self._search()
+                if self._start is None:
+                    break
+            if self._start + slot_len > len(self._buf):
+                break
+            start = self._track(self._start)
+            if start is None:
+                # PSS потерян - поиск заново после уже принятых слотов
+                self._trim(max(self._start - cp, 0))
+                self._start = None
+                continue
+            slots.append(self._decode(self._buf[start:start + slot_len]))
+            self._start = start + slot_len
+
+        # Отбрасываем обработанное
+        if self._start is None:
+            drop = max(len(self._buf) - mod.N_fft - 2 * sym_len, 0)
+        else:
+            drop = max(self._start - cp, 0)
+            self._start -= drop
+        self._trim(drop)
+        return slots
+
+    def _trim(self, drop):
+        """Отбросить первые `drop` отсчётов буфера (и уже посчитанной метрики PSS)"""
+        self._buf = self._buf[drop:]
+        self._corr = self._corr[drop:]
+
+    def _search(self):
+        """
+        Первый PSS в буфере, вокруг которого есть весь символ; начало слота или None
+
+        Метрика считается только для новых позиций (новые отсчёты + N_fft - 1 старых),
+        посчитанная раньше хранится в _corr - на каждый push O(длина буфера rx)
+        """
+        mod = self.mod
+        cp = mod.CP_len
+        sym_len = mod.N_fft + cp
+        done = len(self._corr)
+        if len(self._buf) - done >= mod.N_fft:
+            self._corr = np.concatenate((self._corr, mod._pss_metric(self._buf[done:])[0]))
+        corr = self._corr
+        if len(corr) == 0:
+            return None
+        peaks = mod._pss_peaks(corr, 0)
+        peaks = peaks[(corr[peaks] >= self.threshold) & (peaks >= cp) & (peaks + sym_len <= len(corr))]
+        if len(peaks) == 0:
+            return None
+        return int(peaks[0]) - cp
+
+    def _track(self, start):
+        """
+        Подстройка начала слота по PSS в окне +-CP; None - PSS потерян
+
+        Окон всего 2 * CP + 1 - корреляция одним matmul (corr_no_shift_batch), без FFT
+        """
+        mod = self.mod
+        cp = mod.CP_len
+        base = max(start - cp, 0)
+        windows = sliding_window_view(self._buf[base:start + 2 * cp + mod.N_fft], mod.N_fft)
+        corr = ml.corr_no_shift_batch(windows, ml.pss_template(mod.N_fft, 25, 'symbol'), mode='coherent')
+        pos = int(np.argmax(corr))
+        if corr[pos] < self.threshold:
+            return None
+        return max(base + pos - cp, 0)
+
+    def _decode(self, slot):
+        """Один слот [6 * (N_fft + CP)]: CFO, FFT, эквалайзер, заголовок и CRC"""
+        mod = self.mod
+        N, cp = mod.N_fft, mod.CP_len
+        sym = slot.reshape(6, N + cp).copy()
+
+        # CFO по CP всех символов слота, сглаживание между слотами
+        gamma = np.sum(sym[:, :cp] * np.conj(sym[:, N:]))
+        self._gamma = self.cfo_alpha * self._gamma + gamma
+        self.cfo = -np.angle(self._gamma) / (2 * np.pi)
+        sym *= np.exp(-1j * 2 * np.pi * self.cfo * np.arange(N + cp) / N)
+
+        data, _ = mod.equalize(mod.fft(sym[1:, cp:], ravel=False), self.method)
+        diag('OFDM_RX slot', data, 'scatter')
+        number, total, payload, ok = mod.verify_slots(data.reshape(1, -1))
+        bits = _modem(self.order).demodulate(payload[0], agc='rms')
+        return int(number[0]), int(total[0]), bits, bool(ok[0])
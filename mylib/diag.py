@@ -0,0 +1,121 @@
+"""
+`Диагностика`
+
+- diag
+- set_diag
+- get_diag
+- diagnostics
+- NullSink
+- CaptureSink
+- PlotSink
+
+"""
+
+from contextlib import contextmanager
+
+
+class NullSink:
+    """
+    Приемник диагностики по умолчанию - ничего не делает
+
+    Свой приемник: наследник с enabled = True и методом emit(name, value, kind, **kwargs)
+    """
+    enabled = False
+
+    def emit(self, name, value, kind='plot', **kwargs):
+        pass
+
+
+class CaptureSink(NullSink):
+    """
+    Сохраняет промежуточные массивы (по ссылке, без копирования)
+
+    with ml.diagnostics(ml.CaptureSink()) as cap:
+        ofdm.final_rx(rx)
+
+    cap['corr_pss_time'][-1]
+    """
+    enabled = True
+
+    def __init__(self):
+        self.records = {}
+
+    def emit(self, name, value, kind='plot', **kwargs):
+        self.records.setdefault(name, []).append(value)
+
+    def __getitem__(self, name):
+        return self.records[name]
+
+    def clear(self):
+        self.records.clear()
+
+
+class PlotSink(NullSink):
+    """
+    Рисует точки диагностики как раньше: cool_plot / cool_scatter, 'print' - в консоль
+
+    Параметры
+    ----------
+        `show_plot`: передается в cool_plot / cool_scatter
+    """
+    enabled = True
+
+    def __init__(self, show_plot=False):
+        self.show_plot = show_plot
+
+    def emit(self, name, value, kind='plot', **kwargs):
+        import numpy as np
+        from .plots import cool_plot, cool_scatter
+        if kind == 'print':
+            print(name, '|', value)
+        elif kind == 'scatter':
+            cool_scatter(np.ravel(value), title=name, show_plot=self.show_plot, **kwargs)
+        else:
+            cool_plot(np.ravel(value), title=name, show_plot=self.show_plot, **kwargs)
+
+
+_SINK = NullSink()
+
+def diag(name, value, kind='plot', **kwargs):
+    """
+    Точка диагностики в DSP коде: передает `value` текущему приемнику
+
+    С приемником по умолчанию (NullSink) - только проверка флага
+
+    Параметры
+    ----------
+        `name`: имя точки (заголовок графика)
+
+        `value`: массив / значение (передается по ссылке)
+
+        `kind`: 'plot' | 'scatter' | 'print'
+    """
+    if _SINK.enabled:
+        _SINK.emit(name, value, kind, **kwargs)
+
+def set_diag(sink=None):
+    """
+    Установить приемник диагностики (None - NullSink), возвращает предыдущий
+    """
+    global _SINK
+    prev = _SINK
+    _SINK = NullSink() if sink is None else sink
+    return prev
+
+def get_diag():
+    """Текущий приемник диагностики"""
+    return _SINK
+
+@contextmanager
+def diagnostics(sink):
+    """
+    Приемник диагностики на время блока with
+
+    with ml.diagnostics(ml.PlotSink()):
+        ofdm.final_rx(rx)
+    """
+    prev = set_diag(sink)
+    try:
+        yield sink
+    finally:
+        set_diag(prev)
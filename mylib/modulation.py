@@ -3,20 +3,29 @@
 
 - bpsk
     - bpsk_synchro
+    - bpsk_burst_indexes
+    - bpsk_bursts
+    - bpsk_stream
 - qpsk
 - qam16
 - qam64
 - qam256
+- Modem
 
 `Демодуляция`
 - dem_qpsk
 - dem_qam16
+- dem_qam64
+- dem_qam256
+- dem_soft
 
 """
 
 import numpy as np
+from .base import corr_sliding
 
-def bpsk(bits, amplitude = 2**14, quadrature = 0):
+def bpsk(bits, amplitude = 2**14, quadrature = 0, pi2 = False, phase = 0, bipolar = None,
+         dtype = np.complex128, out = None):
     """
     BPSK модуляция битовой последовательности
 
@@ -30,32 +39,343 @@ def bpsk(bits, amplitude = 2**14, quadrature = 0):
             
         `quadrature` : 0|1, optional
             если 0 то Q=0 | если 1 то Q=I
+            
+        `pi2` : π/2-BPSK (3GPP TS 38.211 5.1.2), каждый нечетный сэмпл повернут на j
+        
+        `phase` : номер первого сэмпла для π/2-BPSK (чётность продолжает прошлый блок)
+        
+        `bipolar` : None - авто (если min(bits) == 0, то 0 -> 1, 1 -> -1, иначе биты ±1)
+            | False - биты 0/1 | True - биты ±1
+            
+        `dtype` : np.complex128 | np.complex64
+        
+        `out` : буфер для сэмплов, optional
         
     Возвращает
     ---------
         `samples` : numpy array
             Массив комплексных чисел, представляющих BPSK модулированные сэмплы.
     """
-    bits = np.array(bits)
-    min = np.min(bits)
-    if  min == 0:               # Маппинг 0 на 1, 1 на -1
+    bits = np.asarray(bits)
+    if bits.dtype.kind in 'ub':   # np.uint8 / bool -> знаковые для 1 - 2*b
+        bits = bits.astype(int)
+    if quadrature not in (0, 1):
+        print("(ERROR MyLib): quadrature не равна 1|0\n")
+        return -1
+    if bipolar is None:
+        bipolar = len(bits) > 0 and np.min(bits) != 0
+    if not bipolar:             # Маппинг 0 на 1, 1 на -1
         sam = bits * -2 + 1
         sam = sam * amplitude
     else:                       # -1 на -1, 1 на 1
         sam = bits * amplitude
-    
-    # Векторизованное преобразование в комплексные числа
-    sig = np.vectorize(complex)(sam.real, sam.imag)
-    if quadrature == 0:
-        sig = np.vectorize(complex)(sam.real, sam.imag)
-    elif quadrature == 1:
-        sig = np.vectorize(complex)(sam.real, sam.real)
-    else:
-        print("(ERROR MyLib): quadrature не равна 1|0\n")
-        return -1
     sqrt = 1/(2**0.5)
+    sam = sam * sqrt
+
+    if out is None:
+        out = np.empty(len(bits), dtype=dtype)
+    out.real = sam
+    if quadrature == 1 or pi2:
+        out.imag = sam
+    else:
+        out.imag = 0
+
+    if pi2:
+        # Нечетные сэмплы: (a + ja) * j = -a + ja
+        odd = out[(1 - phase) % 2::2]
+        odd.real *= -1
+        
+    return out
+
+def bpsk_stream(blocks, amplitude = 2**14, quadrature = 0, pi2 = True, bipolar = False,
+                dtype = np.complex64):
+    """
+    Потоковая BPSK / π/2-BPSK модуляция: на каждый блок бит - блок сэмплов
+    
+    Фаза π/2 сохраняется между блоками, весь payload в памяти не нужен.
+    
+    for samples in ml.bpsk_stream(ml.stream_to_bits("file.bin")):
+        ...
+
+    Параметры
+    ---------
+        `blocks`: итератор по блокам бит
+        
+        `amplitude`, `quadrature`, `pi2`, `bipolar`, `dtype`: как в bpsk
+        
+    Возвращает
+    ---------
+        генератор `samples` : numpy array для каждого блока
+    """
+    phase = 0
+    for bits in blocks:
+        yield bpsk(bits, amplitude, quadrature, pi2, phase, bipolar, dtype)
+        phase = (phase + len(bits)) % 2
+
+def bpsk_bursts(rx_array, syn, threshold = 0.93, min_spacing = None, synchro_angle = 0, derotate = True,
+                burst_len = None, tol = None):
+    """
+    Все пакеты BPSK из длинной записи, каждый развернут на угол своей синхронизации
+
+    Параметры
+    ----------
+        `rx_array`: Массив сигнала
+        
+        `syn`: массив синхронизации
+        
+        `threshold`, `min_spacing`, `burst_len`, `tol`: см. bpsk_burst_indexes
+        
+        `synchro_angle`: 0 | 45 - угол синхронизации (как в bpsk_synchro)
+        
+        `derotate`: False - вернуть срезы rx_array без копирования и без разворота
+    
+    Возвращает
+    --------
+        `bursts`: list of numpy array
+            Пакеты rx_array[start:end]
+    """
+    rx_array = np.asarray(rx_array)
+    pairs, _ = bpsk_burst_indexes(rx_array, syn, threshold, min_spacing, burst_len, tol)
+    bursts = [rx_array[start:end] for start, end in pairs]
+    if not derotate:
+        return bursts
+    
+    angles = _synchro_angle(rx_array[pairs[:, 0]], synchro_angle)
+    rot = np.exp(-1j * angles)
+    return [burst * r for burst, r in zip(bursts, rot)]
+
+class Modem:
+    """
+    QAM модем порядка `order` (4 | 16 | 64 | 256), маппинг 3GPP TS 38.211 V17.5.0 (2023-06)
+    
+    Созвездие считается один раз, модуляция - один lookup по таблице
+    
+    modem = ml.Modem(16)
+    
+    samples = modem.modulate(bits, amplitude=2**14)
+
+    Атрибуты
+    ---------
+        `order`: кол-во точек созвездия
+        
+        `bits_per_symbol`: бит на символ
+        
+        `constellation`: нормированное созвездие (read-only), 
+            индекс - биты символа, первый бит старший
+    """
+    # Кол-во символов за один проход мягкого демаппера
+    _LLR_BLOCK = 2**13
+
+    def __init__(self, order):
+        if order not in (4, 16, 64, 256):
+            raise ValueError("order должен быть 4, 16, 64 или 256")
+        self.order = order
+        self.bits_per_symbol = k = int(np.log2(order))
+
+        # Биты каждой точки: [order, k], первый бит - старший
+        bits = (np.arange(order)[:, np.newaxis] >> np.arange(k - 1, -1, -1)) & 1
+
+        # Уровни по одной оси: v(c0..) = (1-2c0) * (2^(m-1) - v(c1..)), v(c) = 1-2c
+        def axis_levels(c):
+            v = 1 - 2 * c[:, -1]
+            for i in range(c.shape[1] - 2, -1, -1):
+                v = (1 - 2 * c[:, i]) * (2 ** (c.shape[1] - 1 - i) - v)
+            return v
+
+        sqrt = 1/((2 * (order - 1) / 3)**0.5)
+        const = axis_levels(bits[:, 0::2]) + 1j * axis_levels(bits[:, 1::2])
+
+        # Уровни одной оси (для поосевого мягкого решения): индекс - биты оси
+        m = k // 2
+        self._axis_bits = ((np.arange(2**m)[:, np.newaxis] >> np.arange(m - 1, -1, -1)) & 1).astype(bool)
+        self._axis_levels = axis_levels(self._axis_bits.astype(int)) * sqrt
+        self._sqrt = sqrt
+        self.constellation = const * sqrt
+        self.constellation.flags.writeable = False
+        self._const64 = self.constellation.astype(np.complex64)
+        self._const64.flags.writeable = False
+
+    def bits_to_indices(self, bits, packed=False):
+        """
+        Биты -> индексы точек созвездия (np.uint8)
+
+        Параметры
+        ---------
+            `bits`: array, длина кратна bits_per_symbol
+            
+            `packed`: биты упакованы в байты (np.packbits, старший бит первый)
+        """
+        k = self.bits_per_symbol
+        if packed:
+            data = np.asarray(bits, dtype=np.uint8)
+            if 8 % k == 0:
+                # В байте 8/k символов - сдвиги без распаковки
+                shifts = np.arange(8 - k, -1, -k, dtype=np.uint8)
+                return ((data[:, np.newaxis] >> shifts) & (self.order - 1)).ravel()
+            bits = np.unpackbits(data)
+            bits = bits[:len(bits) - len(bits) % k]
+        bits = np.asarray(bits)
+        if len(bits) % k != 0:
+            raise ValueError(f"Длина входной битовой последовательности должна быть кратна {k}")
+        groups = bits.reshape(-1, k).astype(np.uint8, copy=False)
+        return np.packbits(groups, axis=1)[:, 0] >> (8 - k)
+
+    def modulate(self, bits, amplitude=1, packed=False, dtype=np.complex128, out=None):
+        """
+        Модуляция битовой последовательности
+
+        Параметры
+        ---------
+            `bits`: array
+                Битовая последовательность (кратна bits_per_symbol)
+            
+            `amplitude` : int, optional
+            
+            `packed`: биты упакованы в байты np.uint8
+            
+            `dtype`: np.complex128 | np.complex64
+            
+            `out`: буфер для сэмплов, optional
+
+        Возвращает
+        ---------
+            `samples` : numpy array
+                Массив комплексных чисел (модулированные сэмплы)
+        """
+        idx = self.bits_to_indices(bits, packed)
+        if out is not None:
+            dtype = out.dtype
+        const = self._const64 if np.dtype(dtype) == np.complex64 else self.constellation
+        if amplitude != 1:
+            const = const * amplitude
+        return np.take(const, idx, out=out)
+
+    def _scale(self, symbols, amplitude, agc):
+        """Коэффициент перевода принятых символов в уровни созвездия (±1, ±3, ...)"""
+        if agc is None:
+            power = amplitude
+        elif agc == 'rms':
+            # Средняя мощность нормированного созвездия = 1
+            power = np.sqrt(np.mean(symbols.real**2 + symbols.imag**2))
+        elif agc == 'peak':
+            # Крайняя точка по оси = 2^(k/2) - 1
+            peak = max(np.max(np.abs(symbols.real)), np.max(np.abs(symbols.imag)))
+            power = peak / ((2 ** (self.bits_per_symbol // 2) - 1) * self._sqrt)
+        else:
+            raise ValueError("agc должен быть None, 'rms' или 'peak'")
+        if power == 0:
+            return 1
+        return 1 / (power * self._sqrt)
+
+    def demodulate(self, symbols, amplitude=1, agc=None, out=None):
+        """
+        Жесткое решение (hard decision) - поосевой слайсер, без перебора точек
+
+        Параметры
+        ---------
+            `symbols`: array
+                Принятые символы
+            
+            `amplitude`: амплитуда символов (как при модуляции), при agc=None
+            
+            `agc`: автоматическая нормировка вместо `amplitude`
+                None - только `amplitude`
+                
+                'rms' - по средней мощности символов
+                
+                'peak' - по максимальной координате (крайняя точка созвездия)
+            
+            `out`: буфер np.uint8 [len(symbols) * bits_per_symbol], optional
+
+        Возвращает
+        ---------
+            `bits` : numpy array np.uint8
+        """
+        symbols = np.asarray(symbols).ravel()
+        m = self.bits_per_symbol // 2
+        g = self._scale(symbols, amplitude, agc)
+        if out is None:
+            out = np.empty(len(symbols) * 2 * m, dtype=np.uint8)
+        bits = out.reshape(-1, 2 * m)
+
+        # Уровни оси v = (1-2c0) * (2^(m-1) - v(c1..)):
+        # c0 = v < 0, дальше w = 2^(m-i) - |w| и c_i = w < 0
+        for axis, part in ((0, symbols.real), (1, symbols.imag)):
+            w = part * g
+            bits[:, axis] = w < 0
+            for i in range(1, m):
+                w = 2 ** (m - i) - np.abs(w)
+                bits[:, axis + 2 * i] = w < 0
+        return out
+
+    def llr(self, symbols, noise_var=1, amplitude=1, method='maxlog', dtype=np.float32, out=None):
+        """
+        Мягкое решение (soft decision): LLR = log P(b=0) / P(b=1)
         
-    return np.array(sig)*sqrt
+        Созвездие разделимо по осям, поэтому LLR каждого бита считается
+        по sqrt(order) уровням своей оси, без перебора всех точек.
+
+        Параметры
+        ---------
+            `symbols`: array [...] 
+                Символы (любая форма, например [n_sym, n_sc] после эквалайзера)
+            
+            `noise_var`: дисперсия комплексного шума E|n|^2 в масштабе `symbols`
+                Число или массив, совместимый по форме (например [n_sc])
+            
+            `amplitude`: амплитуда символов (как при модуляции)
+            
+            `method`: 'maxlog' | 'exact'
+            
+            `dtype`: np.float32 | np.float64
+            
+            `out`: буфер [..., bits_per_symbol], optional
+
+        Возвращает
+        ---------
+            `llr` : numpy array [..., bits_per_symbol]
+                LLR > 0 - бит 0, порядок бит как в modulate
+        """
+        if method not in ('maxlog', 'exact'):
+            raise ValueError("method должен быть 'maxlog' или 'exact'")
+        y = np.asarray(symbols)
+        if out is None:
+            out = np.empty(y.shape + (self.bits_per_symbol,), dtype=dtype)
+        ftype = out.dtype
+        inv = np.broadcast_to(amplitude**2 / np.asarray(noise_var, dtype=ftype), y.shape)
+        levels = self._axis_levels.astype(ftype)
+        y_flat = y.reshape(-1)
+        inv_flat = inv.reshape(-1)
+        out_flat = out.reshape(-1, self.bits_per_symbol)
+
+        # Блоками, чтобы матрица расстояний [блок, sqrt(order)] оставалась в кэше
+        for start in range(0, len(y_flat), self._LLR_BLOCK):
+            blk = slice(start, start + self._LLR_BLOCK)
+            yb = y_flat[blk] * ftype.type(1 / amplitude)
+            ib = inv_flat[blk, np.newaxis]
+            for axis, part in ((0, yb.real), (1, yb.imag)):
+                d = (part[:, np.newaxis] - levels)**2
+                if method == 'exact':
+                    d *= -ib
+                for i in range(self._axis_bits.shape[1]):
+                    ones = self._axis_bits[:, i]
+                    d0, d1 = d[:, ~ones], d[:, ones]
+                    if method == 'maxlog':
+                        res = (d1.min(-1) - d0.min(-1)) * ib[:, 0]
+                    else:
+                        m0, m1 = d0.max(-1, keepdims=True), d1.max(-1, keepdims=True)
+                        res = (m0 + np.log(np.exp(d0 - m0).sum(-1, keepdims=True))
+                               - m1 - np.log(np.exp(d1 - m1).sum(-1, keepdims=True)))[:, 0]
+                    out_flat[blk, axis + 2 * i] = res
+        return out
+
+_MODEMS = {}
+
+def _modem(order):
+    """Общий объект Modem для порядка `order` (создается один раз)"""
+    if order not in _MODEMS:
+        _MODEMS[order] = Modem(order)
+    return _MODEMS[order]
 
 def qpsk(bits, amplitude = 2**14):
     """
@@ -78,23 +398,7 @@ def qpsk(bits, amplitude = 2**14):
     if len(bits) % 2 != 0:
         raise ValueError("Длина входной битовой последовательности должна быть кратна 2")
 
-    # Создание маппинга символов 16-QAM | 3GPP TS 38.211 V17.5.0 (2023-06)
-    qam_symbols = {
-        (0, 0):  1 + 1j,
-        (0, 1):  1 - 1j,
-        (1, 0): -1 + 1j,
-        (1, 1): -1 - 1j,
-    }
-
-    # Группировка входных битов в 2-битные блоки
-    symbols = [tuple(bits[i:i+2]) for i in range(0, len(bits), 2)]
-    
-    # Сопоставляет каждый 2-битный фрагмент со сложным символом
-    sqrt = 1/(2**0.5)
-    samples = np.array([qam_symbols[s]*sqrt for s in symbols])
-    samples = samples * (amplitude)
-
-    return samples
+    return _modem(4).modulate(bits, amplitude)
 
 def qam16(bits, amplitude = 2**14):
     """16-QAM модуляция для битовой последовательности
@@ -116,21 +420,7 @@ def qam16(bits, amplitude = 2**14):
     if len(bits) % 4 != 0:
         raise ValueError("Длина входной битовой последовательности должна быть кратна 4")
 
-    # Создание маппинга символов 16-QAM | 3GPP TS 38.211 V17.5.0 (2023-06)
-    qam_symbols = {
-    (i, j, k, l): ((1-2*i)*(2-(1-2*k))) + 1j*((1-2*j)*(2-(1-2*l)))
-    for i in range(2) for j in range(2) for k in range(2) for l in range(2)
-    }
-
-    # Группировка входных битов в 4-битные блоки
-    symbols = [tuple(bits[i:i+4]) for i in range(0, len(bits), 4)]
-    
-    # Сопоставляет каждый 4-битный фрагмент со сложным символом
-    sqrt = 1/(10**0.5)
-    samples = np.array([qam_symbols[s]*sqrt for s in symbols])
-    samples = samples * (amplitude)
-
-    return samples
+    return _modem(16).modulate(bits, amplitude)
 
 def qam64(bits, amplitude = 2**14):
     """64-QAM модуляция для битовой последовательности
@@ -152,21 +442,7 @@ def qam64(bits, amplitude = 2**14):
     if len(bits) % 6 != 0:
         raise ValueError("Длина входной битовой последовательности должна быть кратна 6")
 
-    # Создание маппинга символов 16-QAM | 3GPP TS 38.211 V17.5.0 (2023-06)
-    qam_symbols = {
-    (i, j, k, l, m, n): ((1-2*i)*(4 - (1-2*k) * (2-(1-2*m)))) + 1j*((1-2*j)*(4 - (1-2*l) * (2-(1-2*n))))
-    for i in range(2) for j in range(2) for k in range(2) for l in range(2) for m in range(2) for n in range(2)
-    }
-
-    # Группировка входных битов в 6-битные блоки
-    symbols = [tuple(bits[i:i+6]) for i in range(0, len(bits), 6)]
-    
-    # Сопоставляет каждый 6-битный фрагмент со сложным символом
-    sqrt = 1/(42**0.5)
-    samples = np.array([qam_symbols[s]*sqrt for s in symbols])
-    samples = samples * (amplitude)
-
-    return samples
+    return _modem(64).modulate(bits, amplitude)
 
 def qam256(bits, amplitude = 2**14):
     """256-QAM модуляция для битовой последовательности
@@ -174,7 +450,7 @@ def qam256(bits, amplitude = 2**14):
     Параметры
     ---------
         `bits`: array
-            Битовая последовательность (кратна 6)
+            Битовая последовательность (кратна 8)
         
         `amplitude` : int, optional
             По умолчанию 2**14
@@ -186,29 +462,25 @@ def qam256(bits, amplitude = 2**14):
     """
     # Проверьте, кратна ли длина битов 8
     if len(bits) % 8 != 0:
-        raise ValueError("Длина входной битовой последовательности должна быть кратна 6")
+        raise ValueError("Длина входной битовой последовательности должна быть кратна 8")
 
-    # Создание маппинга символов 256-QAM | 3GPP TS 38.211 V17.5.0 (2023-06)
-    qam_symbols = {
-    (i, j, k, l, m, n, o, p): ((1-2*i)*(8 - (1-2*k)*(4 - (1-2*m) * (2-(1-2*o))))) + 1j*((1-2*j)*(8 - (1-2*l)*(4 - (1-2*n) * (2-(1-2*p)))))
-    for i in range(2) for j in range(2) for k in range(2) for l in range(2) for m in range(2) for n in range(2) for o in range(2) for p in range(2)
-    }
-
-    # Группировка входных битов в 8-битные блоки
-    symbols = [tuple(bits[i:i+8]) for i in range(0, len(bits), 8)]
-    
-    # Сопоставляет каждый 8-битный фрагмент со сложным символом
-    sqrt = 1/(170**0.5)
-    samples = np.array([qam_symbols[s]*sqrt for s in symbols])
-    samples = samples * (amplitude)
+    return _modem(256).modulate(bits, amplitude)
 
-    return samples
 
+def _synchro_angle(sample, synchro_angle):
+    """Угол разворота по первому сэмплу синхронизации"""
+    if synchro_angle == 0:
+        return np.angle(sample) # угол синхры если bpsk на угле 0
+    elif synchro_angle == 45:
+        return np.angle(sample) + np.pi/4
+    raise ValueError("Некорректный ввод synchro_angle (0 | 45)")
 
 def bpsk_synchro(rx_array, syn, synchro_angle = 0, debug = False):
     """
     Поиск синхронизации bpsk в сигнале rx
     Разворот на правильный угол, если синхронизация BPSK на угле 0.
+    
+    Только первый пакет, для всех пакетов - bpsk_bursts
         
     Параметры
     ----------
@@ -223,42 +495,109 @@ def bpsk_synchro(rx_array, syn, synchro_angle = 0, debug = False):
         `rx_array`: numpy array
             Развернутый сигнал ограниченный синхронизацией в начале и в конце
     """
-    import mylib as ml
-    cor = ml.auto_corr(rx_array.real, syn)
-    # i_cor = np.argmax(abs(cor), axis=0)
-    for i in range(len(cor)):
-        if abs(cor[i]) >= 0.93:
-            i_cor = i
-            break
+    cor = np.abs(corr_sliding(rx_array.real, syn))
+    above = np.flatnonzero(cor >= 0.93)
+    if len(above) == 0:
+        raise ValueError("Синхронизация не найдена")
+    i_cor = above[0]
     # Поиск второй синхронизации
-    i_cor_end = 0
-    for i in range(i_cor+1, len(cor), 1): 
-        if abs(cor[i]) > 0.95 and i_cor_end == 0:
-            i_cor_end = i
-            break 
+    end = np.flatnonzero(cor[i_cor+1:] > 0.95)
+    i_cor_end = i_cor + 1 + end[0] if len(end) else 0
     if i_cor_end == 0:
         rx_array = rx_array[i_cor:]
     else:
         rx_array = rx_array[i_cor:i_cor_end]
     
     if debug:
-        ml.cool_plot(cor, title="Корреляция")
+        from .plots import cool_plot
+        cool_plot(cor, title="Корреляция")
         print("start =",i_cor, end=" | ")
         print("end =",i_cor_end)  
 
-    if synchro_angle == 0:
-        angle = np.angle(rx_array[0]) # угол синхры если bpsk на угле 0
-    elif synchro_angle == 45:
-         angle = np.angle(rx_array[0]) + np.pi/4
-    else:
-        print("(ERR MYLIB)\n    Некорректный ввод synchro_angle\n")
-    
+    angle = _synchro_angle(rx_array[0], synchro_angle)
     rx_array = rx_array * np.exp(1j * -angle) # разворот на нужный угол
     
     return rx_array
 
+def bpsk_burst_indexes(rx_array, syn, threshold = 0.93, min_spacing = None, burst_len = None, tol = None):
+    """
+    Поиск всех пакетов BPSK (пара синхронизаций начало / конец) в длинной записи
+    
+    Корреляция |<rx, syn>| через FFT (не зависит от фазы пакета), 
+    пики - максимумы участков выше порога,
+    пики ближе `min_spacing` друг к другу сливаются (остается больший).
+    Пара - соседние пики на расстоянии `burst_len` (± `tol`), пики без пары
+    (запись началась посреди пакета, пропущенная метка) отбрасываются.
 
-def dem_qpsk(symbols):
+    Параметры
+    ----------
+        `rx_array`: Массив сигнала
+        
+        `syn`: массив синхронизации
+        
+        `threshold`: порог нормированной корреляции
+        
+        `min_spacing`: минимальное расстояние между метками, по умолчанию len(syn)
+        
+        `burst_len`: расстояние от метки начала до метки конца в отсчетах.
+            По умолчанию - медиана большего из чередующихся расстояний между пиками
+            (пакет длиннее паузы между пакетами)
+        
+        `tol`: допуск на `burst_len`, по умолчанию len(syn)
+    
+    Возвращает
+    --------
+        `pairs`: numpy array [n, 2]
+            Индексы начала и конца каждого пакета (rx_array[start:end])
+            
+        `cor`: numpy array
+            Модуль корреляции
+    """
+    if min_spacing is None:
+        min_spacing = len(syn)
+    if tol is None:
+        tol = len(syn)
+    # Комплексная корреляция - модуль не зависит от поворота фазы пакета
+    cor = np.abs(corr_sliding(rx_array, syn))
+
+    # Участки выше порога -> первый максимум на каждом участке
+    above = np.flatnonzero(cor >= threshold)
+    if len(above) == 0:
+        return np.empty((0, 2), dtype=np.intp), cor
+    vals = cor[above]
+    new_run = np.concatenate(([True], np.diff(above) > 1))
+    run_id = np.cumsum(new_run) - 1
+    run_max = np.maximum.reduceat(vals, np.flatnonzero(new_run))
+    hits = np.flatnonzero(vals == run_max[run_id])
+    _, first = np.unique(run_id[hits], return_index=True)
+    peaks = above[hits[first]]
+
+    # Слияние близких пиков: группы с шагом < min_spacing -> первый максимум группы
+    vals = cor[peaks]
+    new_grp = np.concatenate(([True], np.diff(peaks) >= min_spacing))
+    grp_id = np.cumsum(new_grp) - 1
+    grp_max = np.maximum.reduceat(vals, np.flatnonzero(new_grp))
+    hits = np.flatnonzero(vals == grp_max[grp_id])
+    _, first = np.unique(grp_id[hits], return_index=True)
+    peaks = peaks[hits[first]]
+
+    # Пары по расстоянию: gap[i] = peaks[i+1] - peaks[i]
+    gap = np.diff(peaks)
+    if len(gap) == 0:
+        return np.empty((0, 2), dtype=np.intp), cor
+    if burst_len is None:
+        burst_len = max(np.median(gap[0::2]), np.median(gap[1::2])) if len(gap) > 1 else gap[0]
+    valid = np.abs(gap - burst_len) <= tol
+    # Подряд идущие подходящие расстояния делят пики - берется каждое второе с начала серии
+    idx = np.arange(len(gap))
+    run_start = np.maximum.accumulate(np.where(valid & ~np.concatenate(([False], valid[:-1])), idx, 0))
+    pair = np.flatnonzero(valid & ((idx - run_start) % 2 == 0))
+    pairs = np.stack((peaks[pair], peaks[pair + 1]), axis=1)
+    return pairs, cor
+
+
+
+def dem_qpsk(symbols, amplitude = 1, agc = 'rms'):
     """
     Дешифровка qpsk символов
 
@@ -266,73 +605,95 @@ def dem_qpsk(symbols):
     ---------
         `symbols`: array
             Символы qpsk
+            
+        `amplitude`: амплитуда символов, используется при agc=None
+        
+        `agc`: 'rms' | 'peak' | None - нормировка (см. Modem.demodulate)
 
     Возвращает
     ---------
         `decoded_bits_array` : numpy array
             
     """
+    return _modem(4).demodulate(symbols, amplitude, agc)
+
+def dem_qam16(symbols, amplitude = 1, agc = 'rms'):
+    """
+    Дешифровка qam16 символов
+
+    Параметры
+    ---------
+        `symbols`: array
+            Символы qam16
+            
+        `amplitude`: амплитуда символов, используется при agc=None
         
-    def demodulate_qpsk_symbol(symbol):
-        # Определяем QPSK символы
-        qpsk_symbols = [1+1j, 1-1j, -1+1j, -1-1j]
+        `agc`: 'rms' | 'peak' | None - нормировка (см. Modem.demodulate)
 
-        # Проверяем, находится ли символ в пределах 1 от каждого QPSK символа
-        for i, qpsk_symbol in enumerate(qpsk_symbols):
-            if abs(symbol - qpsk_symbol) <= 1:
-                # Возвращаем соответствующий бит
-                return np.array([i//2, i%2])
+    Возвращает
+    ---------
+        `decoded_bits_array` : numpy array
+            
+    """
+    return _modem(16).demodulate(symbols, amplitude, agc)
 
-        # Если символ не соответствует ни одному из QPSK символов, возвращаем [0, 0]
-        return None
+def dem_qam64(symbols, amplitude = 1, agc = 'rms'):
+    """
+    Дешифровка qam64 символов
 
-    maxi = max(max(symbols.real), max(symbols.imag))
-    symbols = symbols / maxi
-    symbols = symbols * 1.3334
-    
-    # from .plots import cool_scatter 
-    # cool_scatter(symbols)
-    decoded_bits_array = []
-    for sym in symbols:
-        a = demodulate_qpsk_symbol(sym)
-        if a is not None:
-            decoded_bits_array.append(a.tolist())
-    #print(decoded_bits_array)        
-    #decoded_bits_array = np.array([demodulate_qpsk_symbol(sym) for sym in symbols])
-    
-    return np.array(decoded_bits_array).flatten()
+    Параметры
+    ---------
+        `symbols`: array
+            Символы qam64
+            
+        `amplitude`: амплитуда символов, используется при agc=None
+        
+        `agc`: 'rms' | 'peak' | None - нормировка (см. Modem.demodulate)
 
-def dem_qam16(symbols):
+    Возвращает
+    ---------
+        `decoded_bits_array` : numpy array
+            
     """
-    Дешифровка qam16 символов
+    return _modem(64).demodulate(symbols, amplitude, agc)
+
+def dem_qam256(symbols, amplitude = 1, agc = 'rms'):
+    """
+    Дешифровка qam256 символов
 
     Параметры
     ---------
         `symbols`: array
-            Символы qam16
+            Символы qam256
+            
+        `amplitude`: амплитуда символов, используется при agc=None
+        
+        `agc`: 'rms' | 'peak' | None - нормировка (см. Modem.demodulate)
 
     Возвращает
     ---------
         `decoded_bits_array` : numpy array
             
     """
-    # Создание маппинга символов 16-QAM
-    qam16_symbols = {
-    ((1-2*i)*(2-(1-2*k))) + 1j*((1-2*j)*(2-(1-2*l))): (i, j, k, l)
-    for i in range(2) for j in range(2) for k in range(2) for l in range(2)
-    }
-
-    # Нормализация символов
-    maxi = max(max(symbols.real), max(symbols.imag))
-    symbols = symbols / maxi
-    symbols = symbols * 1.3334 * 3
-    
-    # Демодуляция символов
-    decoded_bits_array = []
-    for sym in symbols:
-        # Находим ближайший QAM16 символ
-        closest_symbol = min(qam16_symbols.keys(), key=lambda x: abs(x - sym))
-        # Добавляем соответствующие биты в массив
-        decoded_bits_array.append(qam16_symbols[closest_symbol])
-
-    return np.array(decoded_bits_array).flatten()
\ No newline at end of file
+    return _modem(256).demodulate(symbols, amplitude, agc)
+
+def dem_soft(symbols, order = 4, noise_var = 1, amplitude = 1, method = 'maxlog', dtype = np.float32, out = None):
+    """
+    Мягкая демодуляция (LLR) qpsk / qam16 / qam64 / qam256
+
+    Параметры
+    ---------
+        `symbols`: array [...]
+            Символы (например [n_sym, n_sc])
+            
+        `order`: 4 | 16 | 64 | 256
+        
+        `noise_var`: дисперсия шума E|n|^2 (число или по поднесущим)
+        
+        `amplitude`, `method`, `dtype`, `out`: см. Modem.llr
+
+    Возвращает
+    ---------
+        `llr` : numpy array [..., log2(order)]
+    """
+    return _modem(order).llr(symbols, noise_var, amplitude, method, dtype, out)
\ No newline at end of file
@@ -2,14 +2,18 @@
 - ofdm_64
 - get_sr_from_freq_step
 - activ_carriers
+- CarrierMap
+    - carrier_map
 - synchro_ofdm
+- cp_timing_metric
 """
 
 import numpy as np
-from .base import corr_no_shift
+from .base import _moving_sum
+from .diag import diag
 
 
-def ofdm_64(symbols, amplitude=2**15, ravel=True):
+def ofdm_64(symbols, amplitude=2**15, ravel=True, dtype=np.complex128):
     """
     OFDM модуляция, fft - 64, cp - 16, gb - 6
 
@@ -18,63 +22,64 @@ def ofdm_64(symbols, amplitude=2**15, ravel=True):
         Матрица [n, 80] (16+64)
     elif ravel - True
         Массив [n*80]
-
+        
+    Символы раскладываются по 48 поднесущим (последний OFDM символ дополняется нулями),
+    пилоты на (-21, -7, 7, 21). Без графиков и других побочных эффектов.
     """
     fft_len = 64
     _cyclic_prefix_len = 16
-    _guard_band_len = 6
-    pilot_carriers = (-21, -7, 7, 21)
-    pilot_symbols = (1 + 1j, 1 + 1j, 1 + 1j, -1 - 1j)
-
-    activ = activ_carriers(64, 6, (-21, -7, 7, 21), True)  # 47 carriers
-
-    # Разделение массива symbols на матрицу(по 47 в строке)
-    len_arr = len(activ)
-    symbols1 = np.array_split(
-        symbols[: -(len(symbols) % len_arr)], len(symbols) / len_arr
-    )
-    symbols2 = np.array((symbols[-(len(symbols) % len_arr) :]))
-    symbols1.append(symbols2)
-    symbols = symbols1
-
-    pilot_carriers = np.array(pilot_carriers)
-    pilot_carriers[pilot_carriers < 0] += 64
-
-    # Создание матрицы, в строчке по 47 символов QPSK
-    arr_symols = np.zeros((len(symbols), fft_len), dtype=complex)
-    for i, symbol in enumerate(arr_symols):
-        index_pilot = 0
-        index_sym = 0
-        for j in range(len(symbol)):
-            if j in pilot_carriers:
-                arr_symols[i][j] = pilot_symbols[index_pilot]
-                index_pilot += 1
-            elif j in activ and index_sym < len(symbols[i]):
-                arr_symols[i][j] = symbols[i][index_sym]
-                index_sym += 1
-
-    # arr_symols = np.fft.fftshift(arr_symols, axes=1) # Лишний разворот
-    
-    from .plots import cool_plot
-    cool_plot(np.ravel(arr_symols))
-    
-    # IFFT
-    ifft = np.zeros((len(symbols), fft_len), dtype=complex)
-    for i in range(len(arr_symols)):
-        ifft[i] = np.fft.ifft(arr_symols[i])
+    data_idx, pilot_idx, pilot_val, data_runs = _ofdm_64_maps()
+
+    symbols = np.asarray(symbols)
+    len_arr = len(data_idx)
+    n_sym = max(1, -(-len(symbols) // len_arr))
+    if len(symbols) == n_sym * len_arr:
+        data = symbols.reshape(n_sym, len_arr)
+    else:
+        data = np.zeros((n_sym, len_arr), dtype=dtype)
+        data.ravel()[:len(symbols)] = symbols
 
-    # Добавление циклического префикса
-    fft_cp = np.zeros((len(symbols), (fft_len + _cyclic_prefix_len)), dtype=complex)
-    for i in range(len(arr_symols)):
-        fft_cp[i] = np.concatenate((ifft[i][-_cyclic_prefix_len:], ifft[i]))
+    # Сетка поднесущих: данные - по непрерывным участкам индексов, пилоты - по индексам
+    grid = np.zeros((n_sym, fft_len), dtype=dtype)
+    for start, stop, src in data_runs:
+        grid[:, start:stop] = data[:, src:src + stop - start]
+    grid[:, pilot_idx] = pilot_val
+    diag('ofdm_64', grid)
 
-    fft_cp = fft_cp * amplitude
+    # IFFT всех символов сразу + CP срезом в готовый буфер
+    fft_cp = np.empty((n_sym, fft_len + _cyclic_prefix_len), dtype=dtype)
+    fft_cp[:, _cyclic_prefix_len:] = np.fft.ifft(grid, axis=1)
+    fft_cp[:, :_cyclic_prefix_len] = fft_cp[:, -_cyclic_prefix_len:]
+
+    fft_cp *= amplitude
     if ravel:
-        ret = np.ravel(fft_cp)
-        return ret
+        return fft_cp.ravel()
 
     return fft_cp
 
+def _index_runs(idx):
+    """Разбивает возрастающие индексы на непрерывные участки (start, stop, позиция в idx)"""
+    idx = np.asarray(idx)
+    breaks = np.flatnonzero(np.diff(idx) != 1) + 1
+    first = np.concatenate(([0], breaks))
+    last = np.concatenate((breaks, [len(idx)]))
+    return [(int(idx[a]), int(idx[b - 1]) + 1, int(a)) for a, b in zip(first, last)]
+
+def _ofdm_64_maps():
+    """Индексы данных, пилотов и значения пилотов для ofdm_64 (в порядке возрастания бина)"""
+    global _OFDM_64_MAPS
+    if _OFDM_64_MAPS is None:
+        pilot_carriers = np.array((-21, -7, 7, 21))
+        pilot_symbols = np.array((1 + 1j, 1 + 1j, 1 + 1j, -1 - 1j))
+        pilot_carriers[pilot_carriers < 0] += 64
+        # Пилоты заполнялись по возрастанию бина
+        pilot_idx = np.sort(pilot_carriers)
+        data_idx = np.sort(activ_carriers(64, 6, (-21, -7, 7, 21), True))
+        _OFDM_64_MAPS = (data_idx, pilot_idx, pilot_symbols, _index_runs(data_idx))
+    return _OFDM_64_MAPS
+
+_OFDM_64_MAPS = None
+
 def get_sr_from_freq_step(freq_step, fft_len):
     """Какая должна быть частота дискретизации с определенным шагом между поднесущими и длинной FFT"""
     return freq_step * fft_len
@@ -89,13 +94,11 @@ def activ_carriers(fft_len, GB, PC, zero_64=False):
     
     Возвращает массив поднесущих на которых имеются данные
     """
-    activ = np.array([
-            i
-            for i in range(-fft_len // 2, fft_len // 2)
-            if i in range(-fft_len // 2 + GB, fft_len // 2 - GB + 1)
-            and i not in PC
-            and i != 0
-        ])
+    freqs = np.arange(-fft_len // 2, fft_len // 2)
+    mask = (freqs >= -fft_len // 2 + GB) & (freqs < fft_len // 2 - GB + 1)
+    mask &= ~np.isin(freqs, PC)
+    mask &= freqs != 0
+    activ = freqs[mask]
     if zero_64:
         activ64 = np.array(activ)
         activ64[activ64 < 0] += 64
@@ -103,31 +106,166 @@ def activ_carriers(fft_len, GB, PC, zero_64=False):
     else:
         return activ
 
-def synchro_ofdm(rx):
+class CarrierMap:
     """
-    Циклический префикс - 16
+    Неизменяемая карта поднесущих для (N_fft, GB, пилоты), как в OFDM_MOD
+    
+    Индексы в порядке "после fftshift" (DC в центре, бин N_fft // 2),
+    *_fft - те же поднесущие в порядке np.fft (до fftshift).
+    Создавать через carrier_map(...) - один объект на конфигурацию.
+
+    Атрибуты (read-only)
+    ---------
+        `data`: поднесущие с данными (= OFDM_MOD.activ_carriers())
+        
+        `used`: данные + пилоты (= OFDM_MOD.activ_carriers(True))
+        
+        `pilots`: поднесущие пилотов
+        
+        `guard_mask`: bool [N_fft], True - защитная поднесущая
+        
+        `dc`: индекс DC поднесущей
+        
+        `data_fft`, `used_fft`, `pilots_fft`: индексы для gather / scatter
+            прямо в выход / вход np.fft без fftshift: X[..., data_fft] == fftshift(X)[..., data]
+    """
+    __slots__ = ('N_fft', 'GB', 'dc', 'data', 'used', 'pilots', 'guard_mask',
+                 'data_fft', 'used_fft', 'pilots_fft')
+
+    def __init__(self, N_fft, GB, pilots):
+        def freeze(name, arr):
+            arr = np.asarray(arr)
+            arr.flags.writeable = False
+            object.__setattr__(self, name, arr)
+
+        object.__setattr__(self, 'N_fft', N_fft)
+        object.__setattr__(self, 'GB', GB)
+        object.__setattr__(self, 'dc', N_fft // 2)
+        half = GB // 2
+        in_band = np.zeros(N_fft, dtype=bool)
+        in_band[half:N_fft - half - 1] = True
+        used = in_band.copy()
+        used[N_fft // 2] = False
+        pilot_mask = np.zeros(N_fft, dtype=bool)
+        pilot_mask[np.asarray(pilots, dtype=int)] = True
+
+        freeze('data', np.flatnonzero(used & ~pilot_mask))
+        freeze('used', np.flatnonzero(used))
+        freeze('pilots', np.asarray(pilots, dtype=int).copy())
+        freeze('guard_mask', ~in_band)
+        shift = lambda idx: (idx + N_fft // 2) % N_fft
+        freeze('data_fft', shift(self.data))
+        freeze('used_fft', shift(self.used))
+        freeze('pilots_fft', shift(self.pilots))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CarrierMap неизменяемый")
+
+_CARRIER_MAPS = {}
 
-    fft - 64
+def carrier_map(N_fft, GB, pilots):
+    """
+    Общая карта поднесущих CarrierMap для (N_fft, GB, pilots), создается один раз
+    
+    GB - полная длина защитного интервала (OFDM_MOD.GB_len)
     
-    Возвращает массив начала символов (вместе с CP) (чтобы только символ был нужно index + 16)
+    pilots - поднесущие пилотов (OFDM_MOD.pilot_carriers)
+    """
+    key = (int(N_fft), int(GB), tuple(int(p) for p in pilots))
+    cmap = _CARRIER_MAPS.get(key)
+    if cmap is None:
+        cmap = _CARRIER_MAPS[key] = CarrierMap(*key)
+    return cmap
+
+def cp_timing_metric(rx, fft_len=64, cp=16):
     """
-    corr = [] # Массив корреляции 
-    for i in range(len(rx)):
-        o = corr_no_shift(rx[:16], rx[64:80], complex=True)
-        corr.append(abs(o))
-        rx = np.roll(rx, 1)
+    Метрика синхронизации по циклическому префиксу (van de Beek), O(N)
+    
+    gamma[m] = sum_{n=m}^{m+cp-1} rx[n] * conj(rx[n + fft_len]) - скользящая сумма
+    задержанного произведения, энергия - такая же скользящая сумма.
+
+    Параметры
+    ----------
+        `rx`: принятый сигнал
         
-    corr = np.array(corr) / np.max(corr) # Нормирование
+        `fft_len`: длина FFT
+        
+        `cp`: длина циклического префикса
+
+    Возвращает
+    --------
+        `metric`: NParray [len(rx) - fft_len - cp + 1]
+            |gamma| / энергия, от 0 до 1 (1 - начало символа с CP)
+            
+        `cfo`: NParray той же длины
+            Оценка дробного сдвига частоты (в долях поднесущей) -angle(gamma) / 2pi
+    """
+    # int16 и т.п.: произведения переполняются в целом типе
+    rx = np.asarray(rx, dtype=np.result_type(rx, np.complex64))
+    if len(rx) < fft_len + cp:
+        return np.empty(0), np.empty(0)
+    a = rx[:len(rx) - fft_len]
+    b = rx[fft_len:]
+    gamma = _moving_sum(a * np.conj(b), cp)
+    power = np.abs(a)**2 + np.abs(b)**2
+    energy = 0.5 * _moving_sum(power, cp)
+    # погрешность кумулятивной суммы ~ eps * полная энергия
+    tol = 64 * np.finfo(np.float64).eps * np.sum(power)
+    metric = np.divide(np.abs(gamma), energy, out=np.zeros(len(energy)), where=energy > tol)
+    cfo = -np.angle(gamma) / (2 * np.pi)
+    return metric, cfo
 
-    arr_index = [] # Массив индексов максимальных значений corr
-    for i in range(0, len(corr)-80, 80):
-        max = np.max(corr[i : i+80])
-        if max > 0.9: 
-            arr_index.append(i + np.argmax(corr[i : i+80]))
+def _period_peaks(metric, period, threshold=0.9, offset=0):
+    """
+    По одному максимуму `metric` на каждом периоде (последний неполный тоже),
+    остаются пики выше threshold * max(metric)
+    
+    offset > 0 - первый отрезок [0, offset), его максимум берется всегда
+    """
+    rest = metric[offset:]
+    n_blocks = -(-len(rest) // period)
+    blocks = np.full(n_blocks * period, -np.inf)
+    blocks[:len(rest)] = rest
+    blocks = blocks.reshape(n_blocks, period)
+    pos = np.argmax(blocks, axis=1)
+    keep = blocks[np.arange(n_blocks), pos] > threshold * np.max(metric, initial=0)
+    peaks = offset + (np.arange(n_blocks) * period + pos)[keep]
+    if offset and len(metric):
+        peaks = np.concatenate(([np.argmax(metric[:offset])], peaks))
+    return peaks
+
+def synchro_ofdm(rx, fft_len=64, cp=16, threshold=0.9, return_cfo=False):
+    """
+    Поиск начала OFDM символов по циклическому префиксу, O(N)
+    
+    По умолчанию: Циклический префикс - 16, fft - 64
+    
+    Возвращает массив начала символов (вместе с CP) (чтобы только символ был нужно index + cp)
+    
+    Параметры
+    ----------
+        `rx`: принятый сигнал
+        
+        `fft_len`, `cp`: длина FFT и CP
+        
+        `threshold`: порог от максимума метрики на периоде символа
+        
+        `return_cfo`: вернуть еще оценку дробного CFO для каждого символа
+        
+    Возвращает
+    --------
+        `arr_index`: NParray индексов
+        
+        `cfo`: NParray (если return_cfo) - дробный CFO в долях поднесущей
+    """
+    metric, cfo = cp_timing_metric(rx, fft_len, cp)
+    diag('corr', metric)
+    arr_index = _period_peaks(metric, fft_len + cp, threshold)
     
     ### DEBUG
-    # print(arr_index)
     # from .plots import cool_plot
-    # cool_plot(corr, title='corr')
+    # cool_plot(metric, title='corr')
     
+    if return_cfo:
+        return arr_index, cfo[arr_index]
     return arr_index
@@ -0,0 +1,180 @@
+"""
+`Запись IQ`
+
+- IQRecorder
+- record_iq
+- load_iq
+- replay_iq
+
+Формат: сырой IQ подряд (int16 I, Q чередуются или complex64 'cf32')
+и рядом JSON `<path>.json` с параметрами записи.
+"""
+
+import json
+import time
+import numpy as np
+
+_FORMATS = {'int16': np.int16, 'cf32': np.complex64}
+
+class IQRecorder:
+    """
+    Запись IQ на диск большими последовательными блоками
+
+    with ml.IQRecorder('cap.iq', 'int16', sample_rate=1e6) as rec:
+        for _ in range(100):
+            rec.write(sdr.rx())
+
+    Параметры
+    ----------
+        `path`: файл с отсчётами (JSON пишется в path + '.json' при close)
+
+        `fmt`: 'int16' - I, Q чередуются по int16 (как у Pluto) | 'cf32' - complex64
+
+        `meta`: любые параметры для JSON (sample_rate, lo, rx_gain, ...)
+    """
+    def __init__(self, path, fmt='int16', **meta):
+        if fmt not in _FORMATS:
+            raise ValueError("fmt должен быть 'int16' или 'cf32'")
+        self.path = str(path)
+        self.fmt = fmt
+        self.meta = dict(meta)
+        self.n_samples = 0
+        self.n_buffers = 0
+        self.dropped = 0
+        self.timestamps = []
+        self._buf = np.empty(0, dtype=_FORMATS[fmt])
+        self._file = open(self.path, 'wb')
+
+    def write(self, samples, timestamp=None):
+        """
+        Дописать буфер отсчётов (один вызов sdr.rx())
+
+        `timestamp`: время получения буфера (по умолчанию time.time()) - по разрывам
+        между буферами считаются пропущенные буферы (если известен sample_rate)
+        """
+        samples = np.asarray(samples)
+        n = len(samples)
+        t = time.time() if timestamp is None else timestamp
+        rate = self.meta.get('sample_rate')
+        if self.timestamps and rate and n:
+            expected = n / rate
+            gap = t - self.timestamps[-1]
+            if gap > 1.5 * expected:
+                self.dropped += int(round(gap / expected)) - 1
+        self.timestamps.append(t)
+
+        if self.fmt == 'cf32':
+            np.asarray(samples, dtype=np.complex64).tofile(self._file)
+        else:
+            # Переиспользуемый буфер int16 [n, 2]
+            if len(self._buf) < 2 * n:
+                self._buf = np.empty(2 * n, dtype=np.int16)
+            iq = self._buf[:2 * n].reshape(n, 2)
+            np.copyto(iq[:, 0], np.clip(np.round(samples.real), -2**15, 2**15 - 1), casting='unsafe')
+            np.copyto(iq[:, 1], np.clip(np.round(samples.imag), -2**15, 2**15 - 1), casting='unsafe')
+            iq.tofile(self._file)
+        self.n_samples += n
+        self.n_buffers += 1
+
+    def close(self):
+        """Закрыть файл и записать JSON"""
+        if self._file.closed:
+            return
+        self._file.close()
+        meta = dict(self.meta)
+        meta.update(format=self.fmt, n_samples=self.n_samples, n_buffers=self.n_buffers,
+                    dropped_buffers=self.dropped,
+                    t_start=self.timestamps[0] if self.timestamps else None,
+                    t_stop=self.timestamps[-1] if self.timestamps else None,
+                    timestamps=self.timestamps)
+        with open(self.path + '.json', 'w') as f:
+            json.dump(meta, f, indent=1, default=float)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def record_iq(sdr, path, num_buffers=1, fmt='int16'):
+    """
+    Запись `num_buffers` буферов sdr.rx() в файл
+
+    Параметры sdr (sample_rate, rx_lo, усиление, размер буфера) сохраняются в JSON
+
+    Возвращает
+    ----------
+        `meta`: dict - содержимое JSON
+    """
+    meta = {}
+    for key, attr in (('sample_rate', 'sample_rate'), ('lo', 'rx_lo'),
+                      ('rx_gain', 'rx_hardwaregain_chan0'), ('gain_mode', 'gain_control_mode_chan0'),
+                      ('buffer_size', 'rx_buffer_size')):
+        try:
+            meta[key] = getattr(sdr, attr)
+        except Exception:
+            pass
+    with IQRecorder(path, fmt, **meta) as rec:
+        for _ in range(num_buffers):
+            rec.write(sdr.rx())
+    with open(str(path) + '.json') as f:
+        return json.load(f)
+
+def load_iq(path):
+    """
+    Открыть запись через np.memmap (без чтения в память)
+
+    Возвращает
+    ----------
+        `data`: np.memmap - complex64 [n] для 'cf32', int16 [n, 2] для 'int16'
+
+        `meta`: dict из JSON
+    """
+    path = str(path)
+    with open(path + '.json') as f:
+        meta = json.load(f)
+    fmt = meta['format']
+    n = meta['n_samples']
+    if n == 0:
+        shape = (0, 2) if fmt == 'int16' else (0,)
+        return np.empty(shape, dtype=_FORMATS[fmt]), meta
+    if fmt == 'int16':
+        return np.memmap(path, dtype=np.int16, mode='r', shape=(n, 2)), meta
+    return np.memmap(path, dtype=np.complex64, mode='r', shape=(n,)), meta
+
+def replay_iq(path, chunk_size=2**16, overlap=0):
+    """
+    Чтение записи блоками для приемников (OFDM_RX.push, bpsk_bursts, ...)
+
+    'cf32' - блоки это срезы memmap без копирования,
+    'int16' - перевод в complex64 в один переиспользуемый буфер
+    (блок действителен до следующего шага генератора).
+
+    Параметры
+    ----------
+        `chunk_size`: отсчётов в блоке
+
+        `overlap`: сколько отсчётов конца блока повторяется в начале следующего
+
+    Возвращает
+    ----------
+        генератор блоков complex64
+    """
+    if not 0 <= overlap < chunk_size:
+        raise ValueError("Нужно 0 <= overlap < chunk_size")
+    data, meta = load_iq(path)
+    n = len(data)
+    step = chunk_size - overlap
+    if meta['format'] == 'int16':
+        buf = np.empty(2 * min(chunk_size, n), dtype=np.float32)
+    start = 0
+    while start < n:
+        chunk = data[start:start + chunk_size]
+        if meta['format'] == 'int16':
+            out = buf[:2 * len(chunk)]
+            np.copyto(out.reshape(-1, 2), chunk, casting='unsafe')
+            chunk = out.view(np.complex64)
+        yield chunk
+        if start + chunk_size >= n:
+            break
+        start += step
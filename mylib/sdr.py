@@ -3,16 +3,79 @@
 - sdr_settings
 - tx_sig
 - rx_cycles_buffer
+- SimPluto
   
 """
 
+import numpy as np
+from .channel import Channel
+
+class SimPluto:
+    """
+    Программная замена adi.Pluto без железа: TX -> Channel -> RX
+
+    Те же атрибуты и методы, что используют sdr_settings, tx_sig и rx_cycles_buffer.
+    Буфер TX (циклический или однократный) проходит через модель канала, rx()
+    возвращает следующие rx_buffer_size отсчётов непрерывного потока.
+
+    sdr = ml.sdr_settings('sim', channel=ml.Channel(snr=20, cfo=2e3, delay=37.3, seed=1))
+
+    Параметры
+    ----------
+        `channel`: ml.Channel (по умолчанию - без искажений, только int16)
+    """
+    def __init__(self, channel=None):
+        self.channel = Channel() if channel is None else channel
+        self.rx_lo = int(2e9)
+        self.tx_lo = int(2e9)
+        self.rx_buffer_size = 1024
+        self.sample_rate = int(1e6)
+        self.rx_rf_bandwidth = int(1e6)
+        self.tx_rf_bandwidth = int(1e6)
+        self.gain_control_mode_chan0 = 'manual'
+        self.tx_hardwaregain_chan0 = 0
+        self.rx_hardwaregain_chan0 = 0
+        self.tx_cyclic_buffer = False
+        self._tx = None
+        self._tx_cyclic = False
+        self._tx_start = 0
+        self._power = 1.
+        self._n = 0  # номер следующего отсчёта RX
+
+    def tx(self, samples):
+        """Передача буфера: начинается с текущего момента RX"""
+        samples = np.asarray(samples)
+        self._tx_cyclic = bool(self.tx_cyclic_buffer)
+        self._tx = self.channel.filter(samples, cyclic=self._tx_cyclic)
+        self._power = np.mean(np.abs(samples)**2) if len(samples) else 1.
+        self._tx_start = self._n
+
+    def rx(self):
+        """Следующие rx_buffer_size отсчётов (complex, значения int16 как у Pluto)"""
+        ch = self.channel
+        k = np.arange(self._n, self._n + int(self.rx_buffer_size))
+        self._n += len(k)
+        if self._tx is None:
+            y = np.zeros(len(k), dtype=complex)
+        else:
+            t = (k - self._tx_start) * (1 + ch.sfo * 1e-6) - ch.delay
+            y = ch.resample(self._tx, t, cyclic=self._tx_cyclic)
+        return ch.impair(y, k, self._power, self.sample_rate)
+
+    def tx_destroy_buffer(self):
+        self._tx = None
+
+    def rx_destroy_buffer(self):
+        pass
+
 def sdr_settings(ip = "192.168.3.1",
                  frequency = 2e9,
                  buffer_size = 1e3,
                  sample_rate = 1e6,
                  rf_bandwidth = 1e6,
                  tx_gain = 0, rx_gain = 0,
-                 mode = 'manual'):
+                 mode = 'manual',
+                 channel = None):
     """
     Базовые настройки sdr
     
@@ -20,9 +83,11 @@ def sdr_settings(ip = "192.168.3.1",
     
     sdr = ml.sdr_settings("192.168.3.1", 2300e6, 1000, 1e6, 1e6, 0, 30, 'manual')
     
+    sdr = ml.sdr_settings('sim', channel=ml.Channel(snr=20)) - без железа (SimPluto)
+    
     Параметры
     ----------
-        `ip` : "192.168.3.1" / "192.168.2.1"
+        `ip` : "192.168.3.1" / "192.168.2.1" / 'sim'
         
         `frequency` : частота дискретизации
             от 325 [МГц] до 3.8 [ГГц] | 
@@ -45,13 +110,18 @@ def sdr_settings(ip = "192.168.3.1",
         `mode` : str, optional
             slow_attack, fast_attack, manual
             
+        `channel` : ml.Channel - модель канала для ip = 'sim'
+            
     Возвращает
     ----------  
         `sdr`: настроенный класс "sdr"
     """    
-    import adi
-    ip_str = 'ip:'
-    sdr = adi.Pluto(ip_str+ip)
+    if ip == 'sim':
+        sdr = SimPluto(channel)
+    else:
+        import adi
+        ip_str = 'ip:'
+        sdr = adi.Pluto(ip_str+ip)
 
     sdr.rx_lo = int(frequency)
     sdr.tx_lo = int(frequency)
@@ -94,7 +164,7 @@ def tx_sig(sdr, samples, tx_cycle: bool = True):
         print("(ERROR MyLib): Переменная 'sdr' не определена.")
         return -1
 
-def rx_cycles_buffer(sdr, num_cycles: int = 1):
+def rx_cycles_buffer(sdr, num_cycles: int = 1, path = None, fmt = 'int16'):
     """
     Циклически получает сигнал с RX 
     
@@ -105,15 +175,26 @@ def rx_cycles_buffer(sdr, num_cycles: int = 1):
         `sdr` : переменная sdr
         
         `num_cycles`: сколько раз получает буфер rx
+        
+        `path`: если указан - буферы пишутся на диск (ml.record_iq), а не в память
+        
+        `fmt`: формат записи 'int16' | 'cf32'
     
     Возвращает
     ----------
         `rx`: выводит [num_cycles] циклов RX
+        
+        (если `path`) `meta`: dict параметров записи, открыть - ml.load_iq(path) / ml.replay_iq(path)
     
     """
     from numpy import array 
     
     try:
+        if path is not None:
+            from .record import record_iq
+            meta = record_iq(sdr, path, num_cycles, fmt)
+            sdr.tx_destroy_buffer()
+            return meta
         rx = []
         for _ in range(num_cycles):  # Считывает num_cycles циклов Rx
             new_data = sdr.rx()
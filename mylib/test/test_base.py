@@ -0,0 +1,69 @@
+"""
+Проверки mylib.base без SDR (pytest)
+"""
+
+import numpy as np
+import pytest
+
+import mylib as ml
+from .test_class_ofdm import crc_bitwise
+
+
+def test_crc16_bitwise():
+    rng = np.random.default_rng(0)
+    slots = [rng.integers(0, 2, n).astype(np.uint8) for n in (1, 7, 8, 24, 100, 601)]
+    expected = np.array([crc_bitwise(s) for s in slots])
+
+    assert all(np.array_equal(ml.crc16(s), e) for s, e in zip(slots, expected))
+    assert np.array_equal(ml.crc16(slots), expected)
+    same = np.stack([s[:100] for s in slots[-2:]])
+    assert np.array_equal(ml.crc16(same), [crc_bitwise(s) for s in same])
+
+    coded = [np.concatenate((s, e)) for s, e in zip(slots, expected)]
+    assert ml.crc16_check(coded).all()
+    coded[3][5] ^= 1
+    assert ml.crc16_check(coded).tolist() == [True, True, True, False, True, True]
+
+
+@pytest.mark.parametrize('complex_', [False, True])
+def test_corr_sliding_vs_corr_no_shift(complex_):
+    rng = np.random.default_rng(1)
+    x = rng.standard_normal(700)
+    if complex_:
+        x = x + 1j * rng.standard_normal(700)
+    y = x[300:364] + 0.1 * rng.standard_normal(64)
+
+    expected = [ml.corr_no_shift(x[i:i + len(y)], y) for i in range(len(x) - len(y) + 1)]
+    assert np.allclose(ml.corr_sliding(x, y), expected, atol=1e-12)
+    assert np.allclose(ml.corr_sliding(x, y, norm=False),
+                       [ml.corr_no_shift(x[i:i + len(y)], y, norm=False) for i in range(len(expected))])
+
+
+def test_corr_sliding_int16():
+    """Целочисленный вход не переполняется: нормированная корреляция <= 1"""
+    rng = np.random.default_rng(2)
+    syn = rng.choice([-1, 1], 64)
+    x = np.zeros(2000, dtype=np.int16)
+    x[500:564] = syn * 8000
+    cor = np.abs(ml.corr_sliding(x, syn))
+    assert np.argmax(cor) == 500 and cor.max() == pytest.approx(1)
+
+
+@pytest.mark.parametrize('kind, a', [('pn9', 9), ('pn15', 15), ('pn23', 23)])
+def test_prbs_period(kind, a):
+    period = (1 << a) - 1
+    bits = ml.BitSource(kind).bits(2 * period)
+    assert np.array_equal(bits[:period], bits[period:])
+    # Максимальная длина: нет периода - делителя 2^a - 1
+    for p in range(1, period):
+        if period % p == 0:
+            assert not np.array_equal(bits[:period - p], bits[p:period])
+    assert np.count_nonzero(bits[:period]) == 1 << (a - 1)
+
+
+def test_prbs_stream_chunks():
+    """Блоками - та же последовательность, что одним вызовом"""
+    whole = ml.BitSource('pn15').bits(100000)
+    src = ml.BitSource('pn15')
+    parts = np.concatenate([src.bits(n) for n in (3, 15, 1000, 33333, 65649)])
+    assert np.array_equal(parts, whole)
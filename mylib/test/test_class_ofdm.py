@@ -0,0 +1,83 @@
+"""
+Проверки OFDM_MOD без SDR (pytest)
+"""
+
+import numpy as np
+import pytest
+
+import mylib as ml
+
+G = [1,0,1,0,0,1,1,1,0,1,0,0,0,1,0,1]
+
+def crc_bitwise(bits):
+    """Побитовое деление bits + 16 нулей на G (как было в modulation до векторизации)"""
+    data_crc = list(bits) + 16 * [0]
+    for i in range(len(data_crc) - 16):
+        if data_crc[i] == 1:
+            for j in range(len(G)):
+                data_crc[i + j] ^= G[j]
+    return np.array(data_crc[-16:], dtype=np.uint8)
+
+def sign_bits(symbols):
+    """Жесткие QPSK решения: (Re < 0, Im < 0) на символ"""
+    bits = np.empty(2 * len(symbols), dtype=np.uint8)
+    bits[0::2] = symbols.real < 0
+    bits[1::2] = symbols.imag < 0
+    return bits
+
+@pytest.fixture
+def mod():
+    return ml.OFDM_MOD(None, N_fft=128)
+
+# Полный слот (280 символов данных) + короткий слот (70 символов, 2 строки)
+PAYLOAD_BITS = (np.arange(2 * (280 + 70)) * 7 % 5 % 2).astype(np.uint8)
+
+# CRC этих слотов (при амплитуде 1 - как у modulation до векторизации)
+CRC_FULL = [1,0,0,1,1,1,0,0,0,1,0,1,1,0,0,0]
+CRC_SHORT = [1,0,1,1,1,0,0,0,0,1,0,1,0,1,1,0]
+
+@pytest.mark.parametrize('amplitude', [1, 2**14])
+def test_slot_crc(mod, amplitude):
+    """
+    CRC - по жестким решениям заголовка и данных, от амплитуды QAM не зависит
+    (раньше при амплитуде != 1 заголовок выпадал из CRC)
+    """
+    mod.QAM_sym = ml.qpsk(PAYLOAD_BITS, amplitude)
+    rows = mod._build_slots(np.asarray(mod.QAM_sym))
+    A = len(mod.activ_carriers())
+    assert mod.slot_size() == 280 and rows.shape == (10, A)
+
+    full, short = rows[:5].ravel(), rows[5:].ravel()
+    for slot, n, expected in ((full, 292, CRC_FULL), (short, 82, CRC_SHORT)):
+        crc = sign_bits(slot[n:n + 8])
+        assert np.array_equal(crc, crc_bitwise(sign_bits(slot[:n])))
+        assert crc.tolist() == expected
+
+    _, _, payload, crc_ok = mod.verify_slots([full, short])
+    assert crc_ok.all()
+    assert np.array_equal(sign_bits(np.concatenate(payload)), PAYLOAD_BITS)
+
+
+@pytest.mark.parametrize('channel', [
+    dict(),
+    dict(snr=25, cfo=800, sfo=5, delay=37.3, taps=[1, 0.25j, 0.1], iq_gain=0.3, iq_phase=2, seed=1),
+])
+def test_rx_loopback_sim(mod, channel):
+    """OFDM_MOD -> SimPluto (канал) -> OFDM_RX: все биты и CRC всех слотов"""
+    bits = np.random.default_rng(0).integers(0, 2, 2 * (3 * mod.slot_size() - 9)).astype(np.uint8)
+    mod.QAM_sym = ml.qpsk(bits, 1)
+    tx = mod.modulation()
+
+    sdr = ml.sdr_settings('sim', buffer_size=5000, channel=ml.Channel(**channel))
+    ml.tx_sig(sdr, tx)
+    rx = ml.OFDM_RX(mod)
+    slots = []
+    for _ in range(5):
+        slots += rx.push(sdr.rx())
+
+    assert len(slots) >= 6
+    assert all(ok for _, _, _, ok in slots)
+    first = [s[0] for s in slots].index(1)
+    frame = slots[first:first + 3]
+    assert [(n, total) for n, total, _, _ in frame] == [(1, 3), (2, 3), (3, 3)]
+    assert np.array_equal(np.concatenate([b for _, _, b, _ in frame]), bits)
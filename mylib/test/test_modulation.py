@@ -0,0 +1,36 @@
+"""
+Проверки модема QAM без SDR (pytest)
+"""
+
+import numpy as np
+import pytest
+
+import mylib as ml
+
+
+@pytest.mark.parametrize('order', [4, 16, 64, 256])
+@pytest.mark.parametrize('amplitude', [1, 2**14])
+def test_modem_round_trip(order, amplitude):
+    modem = ml.Modem(order)
+    k = modem.bits_per_symbol
+    bits = np.random.default_rng(order).integers(0, 2, 60 * k).astype(np.uint8)
+
+    symbols = modem.modulate(bits, amplitude)
+    assert len(symbols) == 60
+    assert np.mean(np.abs(modem.constellation)**2) == pytest.approx(1)
+    assert np.array_equal(modem.demodulate(symbols, amplitude), bits)
+    assert np.array_equal(modem.modulate(np.packbits(bits), amplitude, packed=True), symbols)
+
+
+@pytest.mark.parametrize('order', [4, 16, 64, 256])
+@pytest.mark.parametrize('method', ['maxlog', 'exact'])
+def test_modem_llr_signs(order, method):
+    """LLR > 0 - бит 0: без шума знак LLR совпадает с переданным битом"""
+    modem = ml.Modem(order)
+    k = modem.bits_per_symbol
+    bits = np.random.default_rng(1).integers(0, 2, 200 * k).astype(np.uint8)
+    symbols = modem.modulate(bits, 3)
+
+    llr = modem.llr(symbols, noise_var=0.1, amplitude=3, method=method)
+    assert llr.shape == (200, k)
+    assert np.array_equal(llr.ravel() < 0, bits.astype(bool))